@@ -0,0 +1,120 @@
+"""Синтетические данные для нагрузочных прогонов."""
+import os
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from posts.bulk import Importer
+from posts.models import Post
+
+User = get_user_model()
+
+PASSWORD = 'benchmark'
+USERNAME = 'bench_user_{}'
+SLUG = 'bench-group-{}'
+WORDS = ('лента', 'пост', 'новости', 'подписка', 'автор', 'группа',
+         'картинка', 'комментарий', 'читатель', 'запись', 'день', 'город',
+         'книга', 'музыка', 'работа', 'погода', 'вечер', 'дорога')
+IMAGE_SIZES = ((1200, 800), (800, 1200), (1920, 1080))
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _images(directory, rng):
+    names = []
+    for i, size in enumerate(IMAGE_SIZES):
+        name = f'bench_{i}.jpg'
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', size, color).save(os.path.join(directory, name))
+        names.append(name)
+    return names
+
+
+class Dataset:
+    """
+    Набор данных заданного размера. Популярность авторов распределена
+    по закону Ципфа: немногие авторы пишут большую часть постов и
+    собирают большую часть подписчиков, как в настоящей соцсети.
+    """
+
+    def __init__(self, users=100, groups=10, posts=1000, comments=2.0,
+                 follow_density=0.05, image_ratio=0.2, seed=0):
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follow_density = follow_density
+        self.image_ratio = image_ratio
+        self.rng = random.Random(seed)
+        self.weights = [1 / (rank + 1) for rank in range(users)]
+
+    def usernames(self, count):
+        return (USERNAME.format(i) for i in self.rng.choices(
+            range(self.users), weights=self.weights, k=count))
+
+    def create_users(self):
+        # Хеш пароля считается один раз: PBKDF2 на каждого пользователя
+        # занял бы больше времени, чем вся остальная генерация.
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (User(username=USERNAME.format(i), password=password)
+             for i in range(self.users)),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+    def group_rows(self):
+        for i in range(self.groups):
+            yield {'slug': SLUG.format(i), 'title': f'Группа {i}',
+                   'description': _text(self.rng, 12)}
+
+    def post_rows(self, first_id, images):
+        now = timezone.now()
+        for pk, author in enumerate(self.usernames(self.posts), first_id):
+            group = self.rng.randrange(self.groups + 1)
+            has_image = images and self.rng.random() < self.image_ratio
+            yield {
+                'id': pk,
+                'text': _text(self.rng, self.rng.randint(5, 60)),
+                'pub_date': (now - timedelta(
+                    seconds=self.rng.randrange(365 * 24 * 3600))).isoformat(),
+                'author': author,
+                'group': SLUG.format(group) if group < self.groups else None,
+                'image': self.rng.choice(images) if has_image else None,
+            }
+
+    def comment_rows(self, first_id):
+        total = int(self.posts * self.comments)
+        for author in self.usernames(total):
+            yield {
+                'post': first_id + self.rng.randrange(self.posts),
+                'author': author,
+                'text': _text(self.rng, self.rng.randint(3, 20)),
+            }
+
+    def follow_rows(self):
+        per_user = round(self.follow_density * self.users)
+        for i in range(self.users):
+            for author in set(self.usernames(per_user)):
+                yield {'user': USERNAME.format(i), 'author': author}
+
+    def generate(self, image_dir, batch_size=1000, workers=4):
+        """Загружает набор в базу через posts.bulk.Importer."""
+        self.create_users()
+        first_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        images = _images(image_dir, self.rng) if self.image_ratio else []
+        importer = Importer(batch_size=batch_size, image_dir=image_dir,
+                            workers=workers)
+        importer.run('group', self.group_rows())
+        importer.run('post', self.post_rows(first_id, images))
+        if self.posts:
+            importer.run('comment', self.comment_rows(first_id))
+        importer.run('follow', self.follow_rows())
+        return importer.imported
@@ -0,0 +1,99 @@
+import json
+import platform
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks import runner
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержки, пропускную способность и число SQL-запросов '
+            'страниц ленты на текущей базе; см. make_dataset.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', choices=runner.SCENARIOS,
+            help='Какие страницы замерять; по умолчанию все.'
+        )
+        parser.add_argument(
+            '--driver', choices=('client', 'http'), default='client',
+            help='Тестовый клиент Django или HTTP к WSGI-серверу.'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес уже запущенного сервера для --driver http; '
+                 'без него сервер поднимается в этом процессе.'
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.'
+        )
+
+    def make_driver(self, options, reader):
+        if options['driver'] == 'client':
+            return runner.ClientDriver(reader)
+        return runner.HTTPDriver(reader, options['url'],
+                                 options['concurrency'])
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests должно быть не меньше 2.')
+        targets = runner.Targets(options['seed'])
+        driver = self.make_driver(options, targets.reader)
+        results = {}
+        try:
+            for scenario in options['scenario'] or runner.SCENARIOS:
+                reason = targets.missing(scenario)
+                if reason:
+                    self.stderr.write(f'{scenario}: пропущен, {reason}')
+                    continue
+                results[scenario] = runner.run_scenario(
+                    driver, targets, scenario, options['requests'],
+                    options['warmup'])
+                self.report(scenario, results[scenario])
+        finally:
+            driver.close()
+        if options['compare']:
+            self.report_changes(results, options['compare'])
+        if options['output']:
+            self.save(results, options)
+
+    def report(self, scenario, result):
+        self.stdout.write(
+            f'{scenario:<13} {result["rps"]:>8} req/s  '
+            f'p50 {result["p50_ms"]:>8} ms  p95 {result["p95_ms"]:>8} ms  '
+            f'p99 {result["p99_ms"]:>8} ms  '
+            f'SQL {result["queries_per_request"]}  '
+            f'ошибок {result["errors"]}')
+
+    def report_changes(self, results, path):
+        with open(path, encoding='utf-8') as stream:
+            baseline = json.load(stream)['results']
+        for scenario, change in runner.compare(results, baseline).items():
+            self.stdout.write(
+                f'{scenario:<13} p95 {change.get("p95_ms", 0):+}%  '
+                f'rps {change.get("rps", 0):+}%')
+
+    def save(self, results, options):
+        document = {
+            'created': timezone.now().isoformat(),
+            'driver': options['driver'],
+            'concurrency': (1 if options['driver'] == 'client'
+                            else options['concurrency']),
+            'requests': options['requests'],
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as stream:
+            json.dump(document, stream, ensure_ascii=False, indent=2)
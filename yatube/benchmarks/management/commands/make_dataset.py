@@ -0,0 +1,44 @@
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.dataset import PASSWORD, Dataset
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных прогонов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument(
+            '--comments', type=float, default=2.0,
+            help='Среднее число комментариев на пост.'
+        )
+        parser.add_argument(
+            '--follow-density', type=float, default=0.05,
+            help='Доля авторов, на которых подписан каждый пользователь.'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        dataset = Dataset(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follow_density=options['follow_density'],
+            image_ratio=options['image_ratio'],
+            seed=options['seed'],
+        )
+        with tempfile.TemporaryDirectory() as image_dir:
+            imported = dataset.generate(image_dir, options['batch_size'])
+        self.stdout.write(f'Загружено записей: {imported}. '
+                          f'Пароль пользователей: {PASSWORD}')
@@ -0,0 +1,235 @@
+"""Прогон представлений под нагрузкой и сводка замеров."""
+import random
+import re
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from time import perf_counter
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post, UserCounters
+
+User = get_user_model()
+
+SCENARIOS = ('index', 'group_list', 'profile', 'post_detail',
+             'follow_index', 'post_create')
+# Сценарии, которым нужен вошедший пользователь.
+AUTHORIZED = ('follow_index', 'post_create')
+# Число SQL-запросов берётся из Server-Timing, который ставит
+# core.middleware.PerformanceMiddleware.
+QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+SAMPLE_SIZE = 1000
+
+
+class Targets:
+    """Адреса сценариев со случайными группами, авторами и постами."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.slugs = list(Group.objects.values_list('slug', flat=True)[
+            :SAMPLE_SIZE])
+        self.usernames = list(UserCounters.objects.filter(
+            posts_count__gt=0
+        ).order_by('-followers_count').values_list(
+            'user__username', flat=True)[:SAMPLE_SIZE])
+        self.post_ids = list(Post.objects.order_by('?').values_list(
+            'pk', flat=True)[:SAMPLE_SIZE])
+        counters = UserCounters.objects.order_by('-following_count').first()
+        self.reader = counters.user if counters else None
+
+    def missing(self, scenario):
+        """Почему сценарий нельзя прогнать на этих данных, или None."""
+        needs = {
+            'group_list': self.slugs,
+            'profile': self.usernames,
+            'post_detail': self.post_ids,
+        }
+        if scenario in needs and not needs[scenario]:
+            return 'нет данных'
+        if scenario in AUTHORIZED and self.reader is None:
+            return 'нет пользователей'
+        return None
+
+    def url(self, scenario):
+        if scenario == 'group_list':
+            return reverse('posts:group_list',
+                           args=[self.rng.choice(self.slugs)])
+        if scenario == 'profile':
+            return reverse('posts:profile',
+                           args=[self.rng.choice(self.usernames)])
+        if scenario == 'post_detail':
+            return reverse('posts:post_detail',
+                           args=[self.rng.choice(self.post_ids)])
+        return reverse(f'posts:{scenario}')
+
+
+def _queries(timing):
+    match = QUERIES.search(timing or '')
+    return int(match.group(1)) if match else None
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django, в одном потоке."""
+
+    concurrency = 1
+
+    def __init__(self, reader):
+        self.anonymous = Client()
+        self.authorized = Client()
+        if reader is not None:
+            self.authorized.force_login(reader)
+
+    def request(self, scenario, url):
+        client = self.authorized if scenario in AUTHORIZED else self.anonymous
+        start = perf_counter()
+        if scenario == 'post_create':
+            response = client.post(url, {'text': 'Пост из бенчмарка'})
+        else:
+            response = client.get(url)
+        elapsed = perf_counter() - start
+        return response.status_code, elapsed, _queries(
+            response.get('Server-Timing'))
+
+    def close(self):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class HTTPDriver:
+    """
+    Запросы по HTTP к настоящему WSGI-серверу в concurrency потоков.
+    Без base_url поднимает в этом процессе многопоточный wsgiref.
+    Сессия вошедшего пользователя создаётся в базе из настроек, поэтому
+    внешний сервер должен работать с той же базой.
+    """
+
+    def __init__(self, reader, base_url=None, concurrency=4):
+        self.concurrency = concurrency
+        self.server = None
+        if base_url is None:
+            self.server = make_server(
+                '127.0.0.1', 0, get_wsgi_application(),
+                server_class=ThreadingServer, handler_class=QuietHandler)
+            threading.Thread(target=self.server.serve_forever,
+                             daemon=True).start()
+            base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.base_url = base_url.rstrip('/')
+        self.session_id = None
+        if reader is not None:
+            client = Client()
+            client.force_login(reader)
+            self.session_id = client.cookies[
+                settings.SESSION_COOKIE_NAME].value
+        self.local = threading.local()
+
+    def session(self, scenario):
+        name = 'authorized' if scenario in AUTHORIZED else 'anonymous'
+        session = getattr(self.local, name, None)
+        if session is None:
+            session = requests.Session()
+            if name == 'authorized' and self.session_id:
+                session.cookies.set(settings.SESSION_COOKIE_NAME,
+                                    self.session_id)
+            setattr(self.local, name, session)
+        return session
+
+    def csrf_token(self, session, url):
+        token = session.cookies.get(settings.CSRF_COOKIE_NAME)
+        if token is None:
+            session.get(self.base_url + url)
+            token = session.cookies.get(settings.CSRF_COOKIE_NAME)
+        return token
+
+    def request(self, scenario, url):
+        session = self.session(scenario)
+        start = perf_counter()
+        if scenario == 'post_create':
+            token = self.csrf_token(session, url)
+            start = perf_counter()
+            response = session.post(
+                self.base_url + url, data={'text': 'Пост из бенчмарка'},
+                headers={'X-CSRFToken': token}, allow_redirects=False)
+        else:
+            response = session.get(self.base_url + url)
+        elapsed = perf_counter() - start
+        return response.status_code, elapsed, _queries(
+            response.headers.get('Server-Timing'))
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def _percentile(cuts, percent):
+    return round(cuts[percent - 1] * 1000, 2)
+
+
+def _cuts(latencies):
+    """Границы процентилей; единственный замер — каждый из процентилей."""
+    if len(latencies) < 2:
+        return latencies * 99
+    return statistics.quantiles(latencies, n=100, method='inclusive')
+
+
+def summarize(samples, wall_time):
+    """p50/p95/p99 в миллисекундах, запросы в секунду и SQL на запрос."""
+    latencies = [elapsed for _, elapsed, _ in samples]
+    queries = [count for _, _, count in samples if count is not None]
+    cuts = _cuts(latencies)
+    return {
+        'requests': len(samples),
+        'errors': sum(status >= 400 for status, _, _ in samples),
+        'rps': round(len(samples) / wall_time, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'p50_ms': _percentile(cuts, 50),
+        'p95_ms': _percentile(cuts, 95),
+        'p99_ms': _percentile(cuts, 99),
+        'queries_per_request': (
+            round(statistics.mean(queries), 2) if queries else None),
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def run_scenario(driver, targets, scenario, requests_count, warmup=5):
+    urls = [targets.url(scenario) for _ in range(warmup + requests_count)]
+    for url in urls[:warmup]:
+        driver.request(scenario, url)
+    start = perf_counter()
+    if driver.concurrency == 1:
+        samples = [driver.request(scenario, url) for url in urls[warmup:]]
+    else:
+        with ThreadPoolExecutor(driver.concurrency) as pool:
+            samples = list(pool.map(
+                lambda url: driver.request(scenario, url), urls[warmup:]))
+    return summarize(samples, perf_counter() - start)
+
+
+def compare(results, baseline):
+    """Изменение p95 и rps относительно прошлого прогона, в процентах."""
+    changes = {}
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        changes[scenario] = {
+            key: round((current[key] / previous[key] - 1) * 100, 1)
+            for key in ('p95_ms', 'rps') if previous[key]
+        }
+    return changes
@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.testing import TestCase
+from posts.models import Follow, Group, Post
+
+from .runner import SCENARIOS, summarize
+
+
+class BenchmarkTest(TestCase):
+    def test_dataset_and_benchmark(self):
+        """Проверка: набор данных создаётся, прогон пишет JSON."""
+        call_command('make_dataset', users=10, groups=2, posts=30,
+                     image_ratio=0, follow_density=0.3, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertTrue(Follow.objects.exists())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            call_command('benchmark', requests=3, warmup=1, output=path,
+                         stdout=StringIO())
+            with open(path, encoding='utf-8') as stream:
+                results = json.load(stream)['results']
+        self.assertEqual(set(results), set(SCENARIOS))
+        for scenario, result in results.items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['requests'], 3)
+                # Анонимные страницы после прогрева идут из кеша без SQL.
+                self.assertIsNotNone(result['queries_per_request'])
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_summarize_single_sample(self):
+        """Проверка: один замер становится каждым из процентилей."""
+        result = summarize([(200, 0.0125, 3)], wall_time=1)
+        self.assertEqual(result['requests'], 1)
+        self.assertEqual(result['p50_ms'], 12.5)
+        self.assertEqual(result['p99_ms'], 12.5)
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import holes  # noqa: F401
+        from .db.sqlite import configure_connection
+        connection_created.connect(configure_connection)
@@ -0,0 +1,91 @@
+"""
+Общий кеш воркеров на Redis или совместимом сервере (LOCATION —
+redis://host:port/db). Нужен пакет redis (requirements-production.txt).
+
+Целые числа хранятся как есть, чтобы incr выполнял сам сервер
+атомарной командой INCRBY; остальные значения сериализуются pickle.
+"""
+import pickle
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class RedisCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        if redis is None:
+            raise ImproperlyConfigured(
+                'Для RedisCache нужен пакет redis: pip install redis.')
+        self._client = redis.Redis.from_url(location)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _timeout_ms(self, timeout):
+        """Время жизни в миллисекундах для PX; None — бессрочно."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return int(timeout * 1000)
+
+    def _dumps(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _loads(self, raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def get(self, key, default=None, version=None):
+        raw = self._client.get(self._key(key, version))
+        return default if raw is None else self._loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout_ms = self._timeout_ms(timeout)
+        if timeout_ms is not None and timeout_ms <= 0:
+            self._client.delete(key)
+            return
+        self._client.set(key, self._dumps(value), px=timeout_ms)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout_ms = self._timeout_ms(timeout)
+        if timeout_ms is not None and timeout_ms <= 0:
+            return False
+        return bool(self._client.set(
+            self._key(key, version), self._dumps(value), px=timeout_ms,
+            nx=True))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        timeout_ms = self._timeout_ms(timeout)
+        if timeout_ms is None:
+            return bool(self._client.persist(key))
+        return bool(self._client.pexpire(key, max(timeout_ms, 1)))
+
+    def delete(self, key, version=None):
+        self._client.delete(self._key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # INCRBY создал бы отсутствующий ключ, а Django ждёт ValueError.
+        if not self._client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+        return self._client.incrby(key, delta)
+
+    def clear(self):
+        self._client.flushdb()
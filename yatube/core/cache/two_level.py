@@ -0,0 +1,156 @@
+"""
+Двухуровневый кеш: LRU в памяти процесса перед общим для всех воркеров
+хранилищем (файлы, SQLite, Redis).
+
+Чтение сначала ищет значение в памяти и только при промахе идёт в общее
+хранилище; запись идёт в оба уровня. Локальная копия живёт не дольше
+LOCAL_TIMEOUT, так что чужие изменения доходят до воркера за это время.
+
+Быстрее сходятся ключи-версии (поколения лент, веток комментариев):
+они перечисляются в SHARED_ONLY и всегда читаются из общего хранилища.
+Содержимое, в ключ которого входит версия, после записи не меняется, и
+его можно спокойно держать в памяти: смена версии в общем хранилище
+сразу переключает все воркеры на новые ключи.
+
+OPTIONS:
+SHARED — псевдоним общего кеша в CACHES;
+SHARED_ONLY — шаблоны fnmatch ключей, которые не кешируются локально;
+LOCAL_TIMEOUT — сколько секунд живёт локальная копия;
+LOCAL_MAX_ENTRIES — размер LRU.
+"""
+import pickle
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# LRU общий для всех потоков процесса: CacheHandler создаёт экземпляр
+# бэкенда на каждый поток.
+_lrus = {}
+_lrus_lock = Lock()
+_MISSING = object()
+
+
+class LRU:
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Пара (найдено, значение)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+        # Значение хранится сериализованным, как в LocMemCache, чтобы
+        # потоки не делили один изменяемый объект.
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoLevelCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options['SHARED']
+        self._shared_only = tuple(options.get('SHARED_ONLY', ()))
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 10)
+        with _lrus_lock:
+            self._lru = _lrus.setdefault(
+                name, LRU(options.get('LOCAL_MAX_ENTRIES', 1000)))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_key(self, key, version):
+        """Ключ LRU или None, если ключ читается только из общего кеша."""
+        if any(fnmatchcase(key, pattern) for pattern in self._shared_only):
+            return None
+        return self.make_key(key, version=version)
+
+    def _remember(self, local_key, value, timeout):
+        if local_key is None:
+            return
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            if timeout <= 0:
+                self._lru.delete(local_key)
+                return
+            timeout = min(timeout, self._local_timeout)
+        else:
+            timeout = self._local_timeout
+        self._lru.set(local_key, value, timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            found, value = self._lru.get(local_key)
+            if found:
+                return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._remember(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(self._local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if added:
+            self._remember(local_key, value, timeout)
+        elif local_key is not None:
+            self._lru.delete(local_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._lru.delete(local_key)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._lru.delete(local_key)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        self._lru.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,52 @@
+"""
+PostgreSQL с пулом соединений в процессе.
+
+Соединения берутся из psycopg2 ThreadedConnectionPool и возвращаются в
+него, когда Django закрывает соединение в конце запроса (CONN_MAX_AGE = 0).
+Пул держит соединения открытыми между запросами и делит их между
+потоками. Размер задаётся ключом POOL в настройках базы:
+{'MIN_SIZE': 1, 'MAX_SIZE': 20}. MAX_SIZE должен быть не меньше числа
+потоков воркера: свободного соединения пул не ждёт, а сразу бросает
+PoolError.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    with _pools_lock:
+        if alias not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[alias] = pool.ThreadedConnectionPool(
+                options.get('MIN_SIZE', 1), options.get('MAX_SIZE', 20),
+                **conn_params)
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = get_pool(
+            self.alias, self.settings_dict, conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection_pool = get_pool(self.alias, self.settings_dict, {})
+        with self.wrap_database_errors:
+            broken = bool(self.connection.closed)
+            if not broken and self.connection.get_transaction_status() != (
+                    extensions.TRANSACTION_STATUS_IDLE):
+                # В пул соединение уходит без незавершённой транзакции.
+                self.connection.rollback()
+            connection_pool.putconn(self.connection, close=broken)
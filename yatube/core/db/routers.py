@@ -0,0 +1,46 @@
+"""
+Чтение с реплик для лент.
+
+ReplicaMiddleware помечает запрос к представлению из REPLICA_VIEWS, и на
+время такого запроса ReplicaRouter отправляет чтение на случайную
+реплику. Остальные запросы, все записи и миграции идут в основную базу.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias != 'default']
+
+
+class use_replicas:
+    """Контекст, в котором чтение идёт с реплик."""
+
+    def __enter__(self):
+        self.previous = getattr(_state, 'replicas', False)
+        _state.replicas = True
+
+    def __exit__(self, *exc_info):
+        _state.replicas = self.previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and getattr(_state, 'replicas', False):
+            return random.choice(aliases)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
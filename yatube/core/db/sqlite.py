@@ -0,0 +1,81 @@
+"""
+Настройка SQLite под нагрузку.
+
+Каждое новое соединение получает PRAGMA из SQLITE_PRAGMAS: журнал WAL,
+в котором читатели не ждут писателя, synchronous=NORMAL, отображение
+файла в память, больший кеш страниц и ожидание блокировки вместо
+немедленной ошибки.
+
+WAL не спасает от двух одновременных писателей: транзакция, начатая
+чтением, не может стать пишущей, пока пишет другая, и сразу получает
+«database is locked», не дожидаясь busy_timeout. Поэтому пишущие
+представления при SQLITE_WRITE_QUEUE выполняются по одному: в процессе
+их выстраивает блокировка потоков, между процессами — flock на файле
+рядом с базой.
+"""
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection as default_connection
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Приёмник connection_created."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class WriteQueue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lock_file = None
+
+    def file_lock(self):
+        name = default_connection.settings_dict['NAME']
+        if fcntl is None or default_connection.is_in_memory_db():
+            return None
+        if self.lock_file is None:
+            self.lock_file = open(f'{name}.write-lock', 'a')
+        return self.lock_file
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            lock_file = self.file_lock()
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def __exit__(self, *exc_info):
+        if self.lock_file is not None:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+write_queue = WriteQueue()
+
+
+def single_writer(view):
+    """
+    Выполняет представление в очереди писателей. Ставится над
+    transaction.atomic, чтобы транзакция начиналась уже в очереди.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.SQLITE_WRITE_QUEUE or (
+                default_connection.vendor != 'sqlite'):
+            return view(request, *args, **kwargs)
+        with write_queue:
+            return view(request, *args, **kwargs)
+    return wrapper
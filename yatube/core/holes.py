@@ -0,0 +1,7 @@
+"""Фрагменты страниц, общие для всего сайта (см. core.page_cache)."""
+from . import page_cache
+
+
+@page_cache.register('header', 'includes/header.html')
+def header(request):
+    return {}
@@ -0,0 +1,151 @@
+import logging
+import time
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import page_cache
+from .db.routers import use_replicas
+from .performance import (QueryBudgetExceeded, Recorder, instrument,
+                          registry, server_timing)
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет каждый запрос и копит замеры по имени представления.
+    Стоит в MIDDLEWARE первым, чтобы в замер попали запросы к сессии и
+    пользователю, которые делают остальные middleware.
+
+    Если представление сделало больше SQL-запросов, чем указано для него
+    в QUERY_BUDGETS, это пишется в лог, а при QUERY_BUDGET_STRICT
+    запрос завершается ошибкой QueryBudgetExceeded, и тест падает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Общее хранилище двухуровневого кеша не считаем: обращения к
+        # нему уже учтены как промахи его внешнего уровня.
+        shared = {config.get('OPTIONS', {}).get('SHARED')
+                  for config in settings.CACHES.values()}
+        instrument(alias for alias in settings.CACHES if alias not in shared)
+
+    def __call__(self, request):
+        start = perf_counter()
+        with Recorder() as recorder:
+            response = self.get_response(request)
+        duration = perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        budget = settings.QUERY_BUDGETS.get(view)
+        over_budget = budget is not None and recorder.queries > budget
+        registry.observe(view, duration, recorder, over_budget)
+        response['Server-Timing'] = server_timing(duration, recorder)
+        if over_budget:
+            message = (f'{view}: {recorder.queries} SQL-запросов '
+                       f'при бюджете {budget} ({request.path})')
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Выполняет GET-запросы к REPLICA_VIEWS с чтением из реплик. Любой POST
+    и запросы к WRITE_VIEWS (подписка по ссылке — это GET) закрепляют
+    пользователя за основной базой на REPLICA_PIN_SECONDS.
+    """
+
+    cookie = 'primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def view_name(self, request):
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+
+    def reads_from_replica(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        try:
+            pinned = float(request.COOKIES.get(self.cookie, 0))
+        except ValueError:
+            pinned = 0
+        if pinned > time.time():
+            return False
+        return self.view_name(request) in settings.REPLICA_VIEWS
+
+    def __call__(self, request):
+        if self.reads_from_replica(request):
+            with use_replicas():
+                return self.get_response(request)
+        response = self.get_response(request)
+        if (request.method == 'POST'
+                or self.view_name(request) in settings.WRITE_VIEWS):
+            response.set_cookie(
+                self.cookie, str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+        return response
+
+
+class PageCacheMiddleware:
+    """
+    Отдаёт анонимам страницы представлений с page_cache.cached_page
+    целиком из кеша, не доходя до сессий, аутентификации и CSRF.
+    Анонимом считается запрос без cookie сессии; остальные идут по
+    обычному пути и получают закешированную оболочку страницы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def cached_view(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        return match if hasattr(match.func, 'page_scopes') else None
+
+    def __call__(self, request):
+        match = self.cached_view(request)
+        scopes = match.func.page_scopes(**match.kwargs) if match else None
+        if scopes is None:
+            return self.get_response(request)
+        key = page_cache.cache_key('anonymous', request, scopes)
+        cached = cache.get(key)
+        if cached is not None:
+            # Замеры PerformanceMiddleware относятся к представлению.
+            request.resolver_match = match
+            return self.respond(request, *cached)
+        response = self.get_response(request)
+        if page_cache.cacheable(request, response):
+            cache.set(key, (response.content, list(
+                response.items())), settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    def respond(self, request, content, headers):
+        response = HttpResponse(content)
+        for header, value in headers:
+            response[header] = value
+        etag = response.get('ETag')
+        last_modified = parse_http_date_safe(
+            response.get('Last-Modified', ''))
+        if etag or last_modified:
+            return get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+                response=response)
+        return response
@@ -0,0 +1,145 @@
+"""
+Кеш страниц целиком.
+
+Страница отрисовывается один раз как оболочка: вместо фрагментов,
+которые зависят от пользователя (шапка, кнопка подписки, форма
+комментария), в ней стоят метки тега {% hole %}. Метки заполняются на
+каждый запрос, поэтому одна оболочка служит всем вошедшим пользователям.
+Для анонимов заполненная страница кешируется целиком, и
+PageCacheMiddleware отдаёт её раньше сессий, аутентификации и CSRF.
+
+Записи хранятся под общим поколением страниц и поколениями областей,
+от которых страница зависит (лента, пост, автор): их перечисляет
+функция, переданная cached_page. Сигналы моделей (см. posts.pages)
+меняют поколения только затронутых областей, после чего старые записи
+этих страниц просто не читаются; общее поколение сбрасывает все
+страницы сразу.
+"""
+import base64
+import hashlib
+import json
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+GENERATION_KEY = 'core:page_generation'
+HOLE = re.compile(r'<!--hole:(\w+):([\w=-]*)-->')
+
+# Фрагменты: имя -> (шаблон, функция контекста).
+_holes = {}
+
+
+def register(name, template):
+    """
+    Регистрирует фрагмент. Функция получает запрос и аргументы тега и
+    возвращает контекст шаблона; request и user добавляются сами.
+    """
+    def decorator(func):
+        _holes[name] = (template, func)
+        return func
+    return decorator
+
+
+def render_hole(request, name, kwargs):
+    template, func = _holes[name]
+    return render_to_string(template, func(request, **kwargs),
+                            request=request)
+
+
+def hole_marker(name, kwargs):
+    payload = base64.urlsafe_b64encode(
+        json.dumps(kwargs, sort_keys=True).encode()).decode()
+    return f'<!--hole:{name}:{payload}-->'
+
+
+def fill(request, shell):
+    """Оболочка с фрагментами, отрисованными для этого запроса."""
+    def replace(match):
+        kwargs = json.loads(base64.urlsafe_b64decode(match.group(2)))
+        return render_hole(request, match.group(1), kwargs)
+    return HOLE.sub(replace, shell)
+
+
+def _generation_key(scope):
+    return f'{GENERATION_KEY}:{scope}'
+
+
+def generations(scopes=()):
+    """Общее поколение и поколения областей одним обращением к кешу."""
+    keys = [GENERATION_KEY, *map(_generation_key, scopes)]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate(*scopes):
+    """Сбрасывает страницы, зависящие от любой из областей."""
+    for scope in scopes:
+        _bump(_generation_key(scope))
+
+
+def invalidate_all():
+    _bump(GENERATION_KEY)
+
+
+def cache_key(kind, request, scopes=()):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version = '.'.join(map(str, generations(scopes)))
+    return f'core:page:{version}:{kind}:{path}'
+
+
+def cacheable(request, response):
+    return (request.method == 'GET' and response.status_code == 200
+            and not response.streaming and not response.cookies)
+
+
+def cached_page(scopes):
+    """
+    Кеширует оболочку страницы, которую отрисовало представление. При
+    попадании представление не вызывается, а заполняются только метки.
+    Страницы таких представлений анонимам отдаёт PageCacheMiddleware.
+
+    scopes получает именованные аргументы представления и возвращает
+    области, изменение которых сбрасывает страницу, или None, если
+    страницу сейчас кешировать нельзя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_scopes = scopes(**kwargs)
+            if page_scopes is None:
+                return view(request, *args, **kwargs)
+            key = cache_key('shell', request, page_scopes)
+            shell = cache.get(key)
+            if shell is not None:
+                return HttpResponse(fill(request, shell))
+            request.page_shell = True
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                request.page_shell = False
+            if response.status_code != 200 or response.streaming:
+                return response
+            shell = response.content.decode(response.charset)
+            if cacheable(request, response):
+                cache.set(key, shell, settings.PAGE_CACHE_TIMEOUT)
+            response.content = fill(request, shell)
+            return response
+        wrapper.page_scopes = scopes
+        return wrapper
+    return decorator
@@ -0,0 +1,201 @@
+"""
+Замеры запросов: время ответа, SQL-запросы, отрисовка шаблонов и
+обращения к кешу в разрезе представлений.
+
+Счётчики живут в памяти процесса: каждый воркер отдаёт в /metrics
+только свои запросы, суммирует их Prometheus.
+"""
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+# Границы корзин гистограммы времени ответа, с.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+_MISSING = object()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление сделало больше SQL-запросов, чем ему положено."""
+
+
+class Recorder:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __enter__(self):
+        _local.recorder = self
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(
+                connection.execute_wrapper(self.record_query))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
+        _local.recorder = None
+
+    def record_query(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+
+def current_recorder():
+    return getattr(_local, 'recorder', None)
+
+
+def _timed_render(render):
+    def wrapper(self, context=None, request=None):
+        recorder = current_recorder()
+        # Вложенные render_to_string уже учтены во внешнем шаблоне.
+        if recorder is None or recorder.rendering:
+            return render(self, context, request)
+        recorder.rendering = True
+        start = perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            recorder.template_time += perf_counter() - start
+            recorder.rendering = False
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version)
+        recorder = current_recorder()
+        if value is _MISSING:
+            if recorder is not None:
+                recorder.cache_misses += 1
+            return default
+        if recorder is not None:
+            recorder.cache_hits += 1
+        return value
+    wrapper.instrumented = True
+    return wrapper
+
+
+def instrument(cache_aliases):
+    """
+    Подменяет отрисовку шаблонов и чтение из кеша обёртками, которые
+    пишут в замеры текущего запроса. Повторный вызов ничего не меняет.
+    """
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+    for alias in cache_aliases:
+        backend = type(caches[alias])
+        if not getattr(backend.get, 'instrumented', False):
+            backend.get = _counted_get(backend.get)
+
+
+class Registry:
+    """Накопленные замеры по представлениям."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, duration, recorder, over_budget=False):
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                'requests': 0,
+                'duration': 0.0,
+                'buckets': [0] * len(BUCKETS),
+                'queries': 0,
+                'db_time': 0.0,
+                'template_time': 0.0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+                'over_budget': 0,
+            })
+            stats['requests'] += 1
+            stats['duration'] += duration
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][i] += 1
+            stats['queries'] += recorder.queries
+            stats['db_time'] += recorder.db_time
+            stats['template_time'] += recorder.template_time
+            stats['cache_hits'] += recorder.cache_hits
+            stats['cache_misses'] += recorder.cache_misses
+            stats['over_budget'] += over_budget
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(stats, buckets=list(stats['buckets']))
+                    for view, stats in self._views.items()}
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = Registry()
+
+COUNTERS = (
+    ('yatube_db_queries_total', 'queries', 'SQL-запросы.'),
+    ('yatube_db_duration_seconds_total', 'db_time',
+     'Время выполнения SQL-запросов, с.'),
+    ('yatube_template_duration_seconds_total', 'template_time',
+     'Время отрисовки шаблонов, с.'),
+    ('yatube_cache_hits_total', 'cache_hits', 'Попадания в кеш.'),
+    ('yatube_cache_misses_total', 'cache_misses', 'Промахи кеша.'),
+    ('yatube_query_budget_exceeded_total', 'over_budget',
+     'Запросы, превысившие бюджет SQL-запросов.'),
+)
+
+
+def _label(view):
+    escaped = (view.replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n'))
+    return f'view="{escaped}"'
+
+
+def exposition(snapshot):
+    """Замеры в текстовом формате Prometheus."""
+    name = 'yatube_request_duration_seconds'
+    lines = [f'# HELP {name} Время ответа, с.',
+             f'# TYPE {name} histogram']
+    for view, stats in sorted(snapshot.items()):
+        label = _label(view)
+        for bound, count in zip(BUCKETS, stats['buckets']):
+            lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(
+            f'{name}_bucket{{{label},le="+Inf"}} {stats["requests"]}')
+        lines.append(f'{name}_sum{{{label}}} {stats["duration"]}')
+        lines.append(f'{name}_count{{{label}}} {stats["requests"]}')
+    for name, key, description in COUNTERS:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for view, stats in sorted(snapshot.items()):
+            lines.append(f'{name}{{{_label(view)}}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing(duration, recorder):
+    """Значение заголовка Server-Timing, длительности в миллисекундах."""
+    return ', '.join((
+        f'total;dur={duration * 1000:.1f}',
+        f'db;dur={recorder.db_time * 1000:.1f};'
+        f'desc="{recorder.queries} queries"',
+        f'tpl;dur={recorder.template_time * 1000:.1f}',
+        f'cache;desc="{recorder.cache_hits} hits, '
+        f'{recorder.cache_misses} misses"',
+    ))
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core import page_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """
+    Фрагмент, зависящий от пользователя. В оболочке страницы вместо него
+    остаётся метка, которую page_cache заполняет на каждый запрос.
+    Аргументы должны сериализоваться в JSON.
+    """
+    request = context['request']
+    if getattr(request, 'page_shell', False):
+        return mark_safe(page_cache.hole_marker(name, kwargs))
+    return mark_safe(page_cache.render_hole(request, name, kwargs))
@@ -0,0 +1,11 @@
+from django.test import TestCase as DjangoTestCase
+from django.test import override_settings
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, THUMBNAIL_INLINE=True)
+class TestCase(DjangoTestCase):
+    """
+    TestCase проекта: представление, сделавшее больше SQL-запросов, чем
+    разрешает QUERY_BUDGETS, валит тест при любом способе запуска, а
+    миниатюры строятся сразу, без фоновых потоков.
+    """
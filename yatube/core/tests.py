@@ -1,3 +1,297 @@
-# from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from core.testing import TestCase
+from posts.models import Post
+from yatube import profiles
+
+from .cache.sqlite import SQLiteCache
+from .cache.two_level import TwoLevelCache
+from .db.routers import ReplicaRouter, use_replicas
+from .db.sqlite import configure_connection, single_writer
+from .middleware import ReplicaMiddleware
+from .performance import QueryBudgetExceeded, registry
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def test_server_timing(self):
+        """Проверка: ответ несёт замеры запроса в Server-Timing."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('cache;desc=', timing)
+
+    def test_metrics(self):
+        """Проверка: /metrics отдаёт замеры по представлениям."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        body = response.content.decode()
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            body)
+        # Второй раз аноним получает страницу из кеша, без SQL.
+        self.assertIn('yatube_db_queries_total{view="posts:index"} 2', body)
+        self.assertIn('yatube_cache_hits_total{view="posts:index"}', body)
+        self.assertIn('yatube_cache_misses_total{view="posts:index"}', body)
+
+    def test_metrics_local_only(self):
+        """Проверка: /metrics недоступен снаружи."""
+        client = Client(REMOTE_ADDR='203.0.113.1')
+        self.assertEqual(client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Проверка: с токеном адрес не важен, без него не пускает."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 404)
+        client = Client(REMOTE_ADDR='203.0.113.1')
+        response = client.get(reverse('metrics'),
+                              HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 0})
+    def test_query_budget(self):
+        """Проверка: превышение бюджета запросов ловится."""
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+        cache.clear()
+        with override_settings(QUERY_BUDGET_STRICT=False):
+            with self.assertLogs('core.middleware', 'WARNING'):
+                self.client.get(reverse('posts:index'))
+
+
+class ProfilesTest(TestCase):
+    def configure(self, **environ):
+        configured = {
+            'MIDDLEWARE': list(settings.MIDDLEWARE),
+            'DATABASES': {'default': {'ENGINE': 'sqlite3'}},
+        }
+        with mock.patch.dict(os.environ, environ, clear=True):
+            profiles.configure(configured)
+        return configured
+
+    def test_development_by_default(self):
+        """Проверка: без YATUBE_PROFILE настройки не меняются."""
+        configured = self.configure()
+        self.assertEqual(configured['SETTINGS_PROFILE'], 'development')
+        self.assertEqual(configured['DATABASES'],
+                         {'default': {'ENGINE': 'sqlite3'}})
+
+    def test_production(self):
+        """Проверка: production настраивает PostgreSQL, пул и реплики."""
+        configured = self.configure(
+            YATUBE_PROFILE='production',
+            DJANGO_SECRET_KEY='secret',
+            DJANGO_ALLOWED_HOSTS='yatube.example',
+            POSTGRES_POOL_SIZE='10',
+            POSTGRES_REPLICAS='replica-a,replica-b:6432',
+        )
+        databases = configured['DATABASES']
+        self.assertFalse(configured['DEBUG'])
+        self.assertEqual(set(databases),
+                         {'default', 'replica1', 'replica2'})
+        self.assertEqual(databases['default']['ENGINE'],
+                         'core.db.backends.postgresql_pool')
+        self.assertEqual(databases['default']['POOL']['MAX_SIZE'], 10)
+        self.assertEqual(databases['replica2']['PORT'], '6432')
+        self.assertIn('core.middleware.ReplicaMiddleware',
+                      configured['MIDDLEWARE'])
+        self.assertEqual(configured['METRICS_IPS'], ())
+
+    def test_persistent_connections_without_pool(self):
+        """Проверка: без пула соединения держатся CONN_MAX_AGE секунд."""
+        configured = self.configure(
+            YATUBE_PROFILE='production',
+            DJANGO_SECRET_KEY='secret',
+            DJANGO_ALLOWED_HOSTS='yatube.example',
+        )
+        default = configured['DATABASES']['default']
+        self.assertEqual(default['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(default['CONN_MAX_AGE'], 600)
+        self.assertNotIn('DATABASE_ROUTERS', configured)
+
+    def test_sqlite(self):
+        """Проверка: профиль sqlite включает WAL и очередь писателей."""
+        configured = self.configure(
+            YATUBE_PROFILE='sqlite',
+            DJANGO_SECRET_KEY='secret',
+            DJANGO_ALLOWED_HOSTS='yatube.example',
+        )
+        self.assertEqual(configured['SQLITE_PRAGMAS']['journal_mode'], 'WAL')
+        self.assertTrue(configured['SQLITE_WRITE_QUEUE'])
+        self.assertEqual(configured['DATABASES']['default']['CONN_MAX_AGE'],
+                         600)
+
+    def test_missing_secret(self):
+        with self.assertRaises(profiles.ImproperlyConfigured):
+            self.configure(YATUBE_PROFILE='production')
+
+
+@mock.patch('core.db.routers.replicas', return_value=['replica1'])
+class ReplicaRouterTest(TestCase):
+    def test_reads_from_replica_only_inside_context(self, replicas):
+        """Проверка: реплика используется только для помеченных чтений."""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with use_replicas():
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    def test_middleware_pins_writers_to_primary(self, replicas):
+        """Проверка: после POST ленты читаются из основной базы."""
+        middleware = ReplicaMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        self.assertTrue(middleware.reads_from_replica(factory.get('/')))
+        self.assertFalse(middleware.reads_from_replica(
+            factory.get('/create/')))
+        response = middleware(factory.post('/create/'))
+        request = factory.get('/')
+        request.COOKIES[middleware.cookie] = (
+            response.cookies[middleware.cookie].value)
+        self.assertFalse(middleware.reads_from_replica(request))
+        response = middleware(factory.get('/profile/author/follow/'))
+        self.assertIn(middleware.cookie, response.cookies)
+
+
+class SqliteTuningTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -2048,
+                                       'busy_timeout': 1234})
+    def test_pragmas_applied(self):
+        """Проверка: PRAGMA применяются к новому соединению."""
+        configure_connection(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -2048)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_writers_run_one_at_a_time(self):
+        """Проверка: пишущие представления не выполняются параллельно."""
+        running = []
+        overlaps = []
+
+        @single_writer
+        def view(request):
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.01)
+            running.pop()
+
+        threads = [threading.Thread(target=view, args=(None,))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(overlaps), 1)
+
+
+class TwoLevelCacheTest(TestCase):
+    """Два экземпляра с разными LRU ведут себя как два воркера."""
+
+    def setUp(self):
+        options = {
+            'SHARED': 'shared',
+            'SHARED_ONLY': ('version:*',),
+            'LOCAL_TIMEOUT': 10,
+        }
+        self.worker_a = TwoLevelCache('worker-a', {'OPTIONS': options})
+        self.worker_b = TwoLevelCache('worker-b', {'OPTIONS': options})
+        self.worker_a.clear()
+        self.worker_b.clear()
+
+    def test_local_copy_expires(self):
+        """Проверка: чужая запись видна после LOCAL_TIMEOUT."""
+        self.worker_a.set('content', 'старое')
+        self.assertEqual(self.worker_b.get('content'), 'старое')
+        self.worker_a.set('content', 'новое')
+        self.assertEqual(self.worker_a.get('content'), 'новое')
+        self.assertEqual(self.worker_b.get('content'), 'старое')
+        later = time.monotonic() + 11
+        with mock.patch('core.cache.two_level.time.monotonic',
+                        return_value=later):
+            self.assertEqual(self.worker_b.get('content'), 'новое')
+
+    def test_version_keys_converge_at_once(self):
+        """Проверка: смена версии сразу видна всем воркерам."""
+        self.worker_a.add('version:feed', 1)
+        self.assertEqual(self.worker_b.get('version:feed'), 1)
+        self.worker_a.incr('version:feed')
+        self.assertEqual(self.worker_b.get('version:feed'), 2)
+
+    def test_delete_reaches_shared(self):
+        self.worker_a.set('content', 'значение')
+        self.worker_b.delete('content')
+        self.assertIsNone(self.worker_b.get('content'))
+        self.assertIsNone(caches['shared'].get('content'))
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        location = os.path.join(directory.name, 'cache.sqlite3')
+        params = {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}}
+        self.cache = SQLiteCache(location, params)
+        self.other = SQLiteCache(location, params)
+
+    def test_shared_between_instances(self):
+        """Проверка: запись одного экземпляра видна другому."""
+        self.cache.set('key', {'значение': [1, 2]})
+        self.assertEqual(self.other.get('key'), {'значение': [1, 2]})
+        self.assertFalse(self.other.add('key', 'другое'))
+        self.other.delete('key')
+        self.assertTrue(self.cache.add('key', 'другое'))
+
+    def test_incr_and_expiry(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.other.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('short', 'значение', timeout=-1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'снова'))
+
+    def test_cull(self):
+        """Проверка: таблица не растёт больше MAX_ENTRIES."""
+        for i in range(30):
+            self.cache.set(f'key{i}', i)
+            self.cache._cull()
+        count = self.cache._db.execute(
+            'SELECT count(*) FROM cache').fetchone()[0]
+        self.assertLessEqual(count, 10)
@@ -1,7 +1,12 @@
+import hmac
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .performance import exposition, registry
+
 
 def page_not_found(request, exception):
     """Переменная exception содержит отладочную информацию."""
@@ -23,3 +28,20 @@ def permission_denied(request, exception):
         request,
         'core/403.html',
         status=HTTPStatus.FORBIDDEN)
+
+
+def metrics_allowed(request):
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        return hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''), expected)
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_IPS
+
+
+def metrics(request):
+    """Замеры запросов для Prometheus: по METRICS_TOKEN или с METRICS_IPS."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        exposition(registry.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
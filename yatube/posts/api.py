@@ -0,0 +1,217 @@
+"""
+JSON API только для чтения: ленты, пост и его комментарии.
+
+Ленты берутся теми же запросами Post.objects.feed(), что и HTML-страницы,
+и листаются тем же курсором (pub_date, id). Ответ собирается без
+шаблонов: каждая запись сразу превращается в JSON, а страница уходит
+клиенту по частям через StreamingHttpResponse. Параметр fields= задаёт
+нужные поля, остальные не вычисляются вовсе.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from . import comments, follows, thumbnails
+from .models import Group, Post
+from .paginators import KeysetPaginator, decode_cursor
+from .timeline import TimelinePaginator
+
+User = get_user_model()
+
+
+def _image(request, post):
+    return request.build_absolute_uri(post.image.url) if post.image else None
+
+
+def _thumbnails(request, post):
+    urls = thumbnails.urls(post)
+    if urls is None:
+        return None
+    return {fmt: {width: request.build_absolute_uri(url)
+                  for width, url in widths.items()}
+            for fmt, widths in urls.items()}
+
+
+POST_FIELDS = {
+    'id': lambda request, post: post.pk,
+    'text': lambda request, post: post.text,
+    'pub_date': lambda request, post: post.pub_date,
+    'author': lambda request, post: post.author.username,
+    'author_name': lambda request, post: post.author.get_full_name(),
+    'group': lambda request, post: post.group.slug if post.group else None,
+    'comment_count': lambda request, post: post.comment_count,
+    'following': lambda request, post: follows.is_following(
+        request, post.author_id),
+    'image': _image,
+    'thumbnails': _thumbnails,
+    'url': lambda request, post: request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.pk])),
+}
+
+COMMENT_FIELDS = {
+    'id': lambda request, comment: comment.pk,
+    'author': lambda request, comment: comment.author.username,
+    'text': lambda request, comment: comment.text,
+    'created': lambda request, comment: comment.created,
+}
+
+
+class BadRequest(Exception):
+    """Неверные параметры запроса; текст уходит клиенту."""
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def selected_fields(request, available):
+    """Поля из ?fields=a,b; без параметра — все."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available.items())
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise BadRequest(f'Неизвестные поля: {", ".join(unknown)}')
+    return [(name, available[name]) for name in names]
+
+
+def page_size(request, default):
+    try:
+        size = int(request.GET.get('limit', default))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    if not 1 <= size <= settings.API_MAX_PAGE_SIZE:
+        raise BadRequest(
+            f'limit должен быть от 1 до {settings.API_MAX_PAGE_SIZE}')
+    return size
+
+
+def serialize(request, item, fields):
+    return {name: value(request, item) for name, value in fields}
+
+
+def stream_page(request, items, fields, cursors):
+    """
+    Тело ответа по частям: курсоры, затем записи по одной. Память на
+    весь JSON страницы не нужна, первая часть уходит сразу.
+    """
+    yield '{' + ''.join(
+        f'{dumps(name)}: {dumps(value)}, '
+        for name, value in cursors.items()
+    ) + '"results": ['
+    for i, item in enumerate(items):
+        prefix = ', ' if i else ''
+        yield prefix + dumps(serialize(request, item, fields))
+    yield ']}'
+
+
+def json_stream(chunks):
+    return StreamingHttpResponse(
+        (chunk.encode() for chunk in chunks),
+        content_type='application/json; charset=utf-8')
+
+
+def api_view(view):
+    """GET-представление API: ошибки параметров превращаются в 400."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as problem:
+            return error(400, str(problem))
+    return wrapper
+
+
+def feed_response(request, posts, exists=None,
+                  paginator_class=KeysetPaginator):
+    """
+    Страница ленты по курсору. exists проверяет, что лента есть вообще:
+    он нужен, только если первая страница пуста, так что для непустых
+    лент отдельного запроса за группой или автором нет. posts передаётся
+    paginator_class: TimelinePaginator вместо постов получает
+    пользователя. На испорченный курсор, как и в комментариях, — 400.
+    """
+    fields = selected_fields(request, POST_FIELDS)
+    size = page_size(request, settings.PAGINATE_BY)
+    cursor = request.GET.get('cursor')
+    if cursor and decode_cursor(cursor) is None:
+        raise BadRequest('Неверный курсор')
+    paginator = paginator_class(posts, size)
+    page = paginator.get_page(cursor)
+    if not page.object_list and exists is not None and not exists():
+        return error(404, 'Не найдено')
+    cursors = {
+        'next': paginator.next_cursor,
+        'previous': paginator.previous_cursor,
+    }
+    return json_stream(
+        stream_page(request, page.object_list, fields, cursors))
+
+
+@api_view
+def index(request):
+    return feed_response(request, Post.objects.feed())
+
+
+@api_view
+def group_posts(request, slug):
+    return feed_response(
+        request, Post.objects.feed().filter(group__slug=slug),
+        exists=Group.objects.filter(slug=slug).exists)
+
+
+@api_view
+def profile(request, username):
+    return feed_response(
+        request, Post.objects.feed().filter(author__username=username),
+        exists=User.objects.filter(username=username).exists)
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти')
+    return feed_response(request, request.user,
+                         paginator_class=TimelinePaginator)
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    post = Post.objects.feed().filter(pk=post_id).first()
+    if post is None:
+        return error(404, 'Не найдено')
+    return JsonResponse(serialize(request, post, fields),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def post_comments(request, post_id):
+    """Комментарии по порядку, курсор next ведёт к следующей странице."""
+    fields = selected_fields(request, COMMENT_FIELDS)
+    size = page_size(request, settings.COMMENTS_PER_PAGE)
+    cursor = request.GET.get('cursor')
+    if cursor and comments.decode_cursor(cursor) is None:
+        raise BadRequest('Неверный курсор')
+    rows = list(comments.thread(post_id, cursor)[:size + 1])
+    if not rows and not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Не найдено')
+    has_next = len(rows) > size
+    rows = rows[:size]
+    cursors = {
+        'next': comments.encode_cursor(rows[-1]) if has_next else None,
+    }
+    return json_stream(stream_page(request, rows, fields, cursors))
@@ -0,0 +1,357 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+
+from core import page_cache
+
+from . import counters, follows, search, uploads
+from .caching import bump_feed_generation
+from .conditional import mark_structure_changed
+from .models import Comment, Follow, Group, Post, ThumbnailJob
+
+User = get_user_model()
+
+FORMATS = ('ndjson', 'csv')
+
+# Поля выгрузки: ключ в файле и путь поля в ORM. Авторы и группы
+# выгружаются по username и slug, чтобы файл переносился между базами.
+COLUMNS = {
+    'group': (Group, (
+        ('slug', 'slug'),
+        ('title', 'title'),
+        ('description', 'description'),
+    )),
+    'post': (Post, (
+        ('id', 'id'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('image', 'image'),
+    )),
+    'comment': (Comment, (
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    )),
+    'follow': (Follow, (
+        ('user', 'user__username'),
+        ('author', 'author__username'),
+    )),
+}
+MODELS = tuple(COLUMNS)
+
+
+def fieldnames(model):
+    return [key for key, _ in COLUMNS[model][1]]
+
+
+def export_rows(model, chunk_size, queryset=None):
+    """
+    Строки выгрузки по одной. Связанные имена приходят JOIN-ом в том же
+    запросе, а iterator() держит в памяти не больше chunk_size строк.
+    queryset ограничивает выгрузку, например выбранным в админке.
+    """
+    model_class, columns = COLUMNS[model]
+    if queryset is None:
+        queryset = model_class.objects.all()
+    rows = queryset.order_by('pk').values_list(
+        *(lookup for _, lookup in columns))
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for (key, _), value in zip(columns, row)
+        }
+
+
+class _Line:
+    """Файл для csv.writer, который возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(rows, fmt, fields):
+    """Выгрузка построчно: строки текста для записи или отдачи клиенту."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(_Line(), fieldnames=fields)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def write_rows(rows, stream, fmt, fields):
+    for line in stream_rows(rows, fmt, fields):
+        stream.write(line)
+
+
+def read_rows(stream, fmt):
+    """Записи из файла по одной; пустые значения CSV считаются None."""
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value or None for key, value in row.items()}
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_edges(stream):
+    """
+    Подписки из списка рёбер: строка «user author» через пробел или
+    табуляцию. Пустые строки и строки с # пропускаются.
+    """
+    for line in stream:
+        fields = line.split('#', 1)[0].split()
+        if len(fields) == 2:
+            yield {'user': fields[0], 'author': fields[1]}
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    batch = list(islice(rows, size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, size))
+
+
+def create_dated(model, objects, field):
+    """
+    bulk_create с датами из файла. auto_now_add подставляет при вставке
+    текущее время, поэтому даты записываются следом одним bulk_update;
+    объектам нужны заранее известные id.
+    """
+    dates = [getattr(obj, field) for obj in objects]
+    model.objects.bulk_create(objects)
+    for obj, date in zip(objects, dates):
+        setattr(obj, field, date)
+    model.objects.bulk_update(objects, [field])
+
+
+def reset_sequences(*models):
+    """Сдвигает последовательности id за последние загруженные записи."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def parse_date(value):
+    return parse_datetime(value) if value else timezone.now()
+
+
+class Importer:
+    """
+    Загружает записи пачками по batch_size: каждая пачка — один
+    bulk_create в своей транзакции. Авторы и группы ищутся по словарям,
+    загруженным один раз, картинки копируются в хранилище параллельно.
+    """
+
+    def __init__(self, batch_size=1000, image_dir=None, workers=4,
+                 create_users=False):
+        self.batch_size = batch_size
+        self.image_dir = image_dir
+        self.workers = workers
+        self.create_users = create_users
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.next_ids = {}
+        self.imported = 0
+        self.skipped = 0
+        # Строки, пропущенные из-за ошибки, с её описанием.
+        self.errors = []
+        # Чьи счётчики и у каких постов число комментариев изменил импорт.
+        self.touched_users = set()
+        self.touched_posts = set()
+
+    def run(self, model, rows):
+        load = getattr(self, f'import_{model}')
+        with ThreadPoolExecutor(self.workers) as pool:
+            self.pool = pool
+            for batch in batched(rows, self.batch_size):
+                with transaction.atomic():
+                    load(batch)
+        # Сигналы при bulk_create не посылаются: счётчики и кеш лент
+        # приводятся в порядок один раз в конце.
+        self.recount()
+        # Посты и комментарии вставлены с явными id, последовательность
+        # PostgreSQL о них не знает; в SQLite сбрасывать нечего.
+        reset_sequences(COLUMNS[model][0])
+        bump_feed_generation()
+        mark_structure_changed()
+        page_cache.invalidate_all()
+
+    def recount(self):
+        """Пересчитывает счётчики только затронутых импортом записей."""
+        for user_ids in batched(self.touched_users, self.batch_size):
+            counters.recount(user_ids)
+        for post_ids in batched(self.touched_posts, self.batch_size):
+            counters.recount_comments(post_ids)
+        self.touched_users.clear()
+        self.touched_posts.clear()
+
+    def user_ids(self, usernames):
+        missing = {name for name in usernames
+                   if name and name not in self.users}
+        if missing and self.create_users:
+            User.objects.bulk_create(
+                (User(username=name, password=make_password(None))
+                 for name in missing),
+                ignore_conflicts=True,
+            )
+            created = dict(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+            self.users.update(created)
+            self.touched_users.update(created.values())
+        return self.users
+
+    def new_ids(self, model, rows):
+        """
+        id из файла или следующий свободный. Свободные выдаются после
+        всех уже встреченных id, чтобы не столкнуться с ними.
+        """
+        if model not in self.next_ids:
+            last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+            self.next_ids[model] = last + 1
+        given = [int(row['id']) for row in rows if row.get('id')]
+        next_id = max([self.next_ids[model], *(pk + 1 for pk in given)])
+        ids = []
+        for row in rows:
+            if row.get('id'):
+                ids.append(int(row['id']))
+            else:
+                ids.append(next_id)
+                next_id += 1
+        self.next_ids[model] = next_id
+        return ids
+
+    def fresh(self, model, batch):
+        """
+        Записи пачки, id которых ещё не заняты: повторный импорт того же
+        файла ничего не дублирует.
+        """
+        existing = set(model.objects.filter(
+            pk__in=[int(row['id']) for row in batch if row.get('id')]
+        ).values_list('pk', flat=True))
+        return [row for row in batch
+                if not (row.get('id') and int(row['id']) in existing)]
+
+    def store_image(self, name):
+        """
+        Копирует картинку в хранилище в потоке пула. Для картинки-бомбы
+        возвращает None, и её пост пропускается.
+        """
+        if not name or not self.image_dir:
+            return name or ''
+        try:
+            with open(os.path.join(self.image_dir, name), 'rb') as source:
+                return uploads.store(File(source))
+        except Image.DecompressionBombError as error:
+            self.errors.append(f'{name}: {error}')
+            return None
+        finally:
+            # Соединение потока пула иначе осталось бы открытым.
+            connection.close()
+
+    def import_group(self, batch):
+        Group.objects.bulk_create(
+            (Group(slug=row['slug'], title=row['title'],
+                   description=row.get('description') or '')
+             for row in batch),
+            ignore_conflicts=True,
+        )
+        self.groups.update(Group.objects.filter(
+            slug__in=[row['slug'] for row in batch]
+        ).values_list('slug', 'pk'))
+        self.imported += len(batch)
+
+    def import_post(self, batch):
+        users = self.user_ids(row['author'] for row in batch)
+        rows = [row for row in self.fresh(Post, batch)
+                if row['author'] in users]
+        images = self.pool.map(self.store_image,
+                               [row.get('image') for row in rows])
+        posts = [
+            Post(
+                id=pk,
+                text=row['text'] or '',
+                pub_date=parse_date(row.get('pub_date')),
+                author_id=users[row['author']],
+                group_id=self.groups.get(row.get('group')),
+                image=image,
+            )
+            for pk, row, image in zip(self.new_ids(Post, rows), rows, images)
+            if image is not None
+        ]
+        create_dated(Post, posts, 'pub_date')
+        self.touched_users.update(post.author_id for post in posts)
+        search.index_rows((post.pk, post.text) for post in posts)
+        # Одинаковые картинки хранятся одним файлом: одно задание на файл.
+        jobs = {post.image.name: post.pk for post in posts if post.image}
+        ThumbnailJob.objects.bulk_create(
+            ThumbnailJob(post_id=pk, image=image)
+            for image, pk in jobs.items()
+        )
+        self.skipped += len(batch) - len(posts)
+        self.imported += len(posts)
+
+    def import_comment(self, batch):
+        users = self.user_ids(row['author'] for row in batch)
+        # Комментарий без поста выгружается с пустым post и так же
+        # загружается; комментарии к отсутствующим постам пропускаются.
+        rows = self.fresh(Comment, batch)
+        post_ids = [int(row['post']) if row.get('post') else None
+                    for row in rows]
+        posts = set(Post.objects.filter(
+            pk__in={pk for pk in post_ids if pk is not None}
+        ).values_list('pk', flat=True))
+        posts.add(None)
+        rows = [(post_id, row) for post_id, row in zip(post_ids, rows)
+                if row['author'] in users and post_id in posts]
+        comments = [
+            Comment(
+                id=pk,
+                post_id=post_id,
+                author_id=users[row['author']],
+                text=row['text'] or '',
+                created=parse_date(row.get('created')),
+            )
+            for pk, (post_id, row) in zip(
+                self.new_ids(Comment, [row for _, row in rows]), rows)
+        ]
+        create_dated(Comment, comments, 'created')
+        self.touched_posts.update(
+            comment.post_id for comment in comments if comment.post_id)
+        self.skipped += len(batch) - len(comments)
+        self.imported += len(comments)
+
+    def import_follow(self, batch):
+        users = self.user_ids(
+            name for row in batch for name in (row['user'], row['author']))
+        pairs = {
+            (users[row['user']], users[row['author']]) for row in batch
+            if row['user'] in users and row['author'] in users
+            and row['user'] != row['author']
+        }
+        follows.create(pairs)
+        self.touched_users.update(pk for pair in pairs for pk in pair)
+        self.skipped += len(batch) - len(pairs)
+        self.imported += len(pairs)
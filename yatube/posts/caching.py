@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEED_GENERATION_KEY = 'posts:feed_generation'
+
+
+def feed_generation():
+    """
+    Текущее поколение лент. Входит в ключи кеша фрагментов, поэтому
+    после любого изменения постов, групп или комментариев старые
+    фрагменты просто перестают читаться.
+    """
+    generation = cache.get(FEED_GENERATION_KEY)
+    if generation is None:
+        # Начинаем с отметки времени, чтобы после вытеснения ключа
+        # не вернуться к номеру, под которым уже лежат старые фрагменты.
+        cache.add(FEED_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(FEED_GENERATION_KEY)
+    return generation
+
+
+def bump_feed_generation():
+    try:
+        cache.incr(FEED_GENERATION_KEY)
+    except ValueError:
+        cache.set(FEED_GENERATION_KEY, time.time_ns(), None)
+
+
+def feed_cache_context():
+    """Переменные для тега {% cache %} в шаблонах лент."""
+    return {
+        'feed_generation': feed_generation(),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,158 @@
+"""
+Ветка комментариев поста: страницы по курсору (created, id), которые
+хранятся в кеше уже отрисованными.
+
+Страница определяется курсором, после которого она начинается. Новые
+комментарии попадают только в последнюю страницу (хвост), поэтому
+остальные страницы не меняются, а хвост дописывается на месте.
+Удаление или правка комментария сбрасывает всю ветку поста сменой
+её поколения.
+"""
+import base64
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
+from django.utils.safestring import mark_safe
+
+from .models import Comment
+
+FIRST = 'first'
+
+
+def encode_cursor(comment):
+    raw = f'{comment.created.isoformat()}|{comment.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор; для испорченного курсора возвращает None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created, pk = base64.urlsafe_b64decode(
+            padded.encode()).decode().split('|')
+        created, pk = parse_datetime(created), int(pk)
+    except ValueError:
+        return None
+    if created is None:
+        return None
+    return created, pk
+
+
+def _generation_key(post_id):
+    return f'posts:comments:{post_id}:generation'
+
+
+def _generation(post_id):
+    key = _generation_key(post_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _key(post_id, generation, start):
+    return f'posts:comments:{post_id}:{generation}:{start}'
+
+
+def invalidate(post_id):
+    try:
+        cache.incr(_generation_key(post_id))
+    except ValueError:
+        pass
+
+
+def _render(comment):
+    return render_to_string('posts/includes/comment.html',
+                            {'comment': comment})
+
+
+def thread(post_id, cursor=None):
+    """Комментарии поста по порядку, начиная после курсора."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'author__username').order_by(
+        'created', 'pk')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created, pk = position
+        comments = comments.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk))
+    return comments
+
+
+def _build(post, start):
+    comments = thread(post.pk, start if start != FIRST else None)
+    size = settings.COMMENTS_PER_PAGE
+    comments = list(comments[:size + 1])
+    page = comments[:size]
+    return {
+        'items': [_render(comment) for comment in page],
+        'last': encode_cursor(page[-1]) if page else start,
+        'has_next': len(comments) > size,
+        'total': post.comment_count,
+    }
+
+
+class CommentPage:
+    def __init__(self, data, start):
+        self.html = mark_safe(''.join(data['items']))
+        self.next_cursor = data['last'] if data['has_next'] else None
+        self.is_first = start == FIRST
+
+
+def get_page(post, cursor=None):
+    """
+    Страница комментариев, начинающаяся после cursor. Хвост ветки
+    сверяется с post.comment_count: если дописывание в кеш потерялось
+    из-за гонки, хвост перечитывается из базы.
+    """
+    start = cursor if cursor and decode_cursor(cursor) else FIRST
+    generation = _generation(post.pk)
+    key = _key(post.pk, generation, start)
+    data = cache.get(key)
+    stale = (data is not None and not data['has_next']
+             and data['total'] != post.comment_count)
+    if data is None or stale:
+        data = _build(post, start)
+        cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+        if not data['has_next']:
+            cache.set(_key(post.pk, generation, 'tail'), start,
+                      settings.FEED_CACHE_TIMEOUT)
+    return CommentPage(data, start)
+
+
+def append(comment):
+    """
+    Дописывает новый комментарий в закешированный хвост ветки. Если хвост
+    заполнен, комментарий открывает новую страницу. Ничего не делает,
+    если хвоста в кеше нет: его соберёт следующий просмотр.
+    """
+    generation = _generation(comment.post_id)
+    tail_key = _key(comment.post_id, generation, 'tail')
+    start = cache.get(tail_key)
+    if start is None:
+        return
+    key = _key(comment.post_id, generation, start)
+    data = cache.get(key)
+    if data is None or data['has_next']:
+        return
+    html = _render(comment)
+    if len(data['items']) < settings.COMMENTS_PER_PAGE:
+        data['items'].append(html)
+        data['last'] = encode_cursor(comment)
+        data['total'] += 1
+        cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+        return
+    data['has_next'] = True
+    cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+    cache.set(_key(comment.post_id, generation, data['last']), {
+        'items': [html],
+        'last': encode_cursor(comment),
+        'has_next': False,
+        'total': data['total'] + 1,
+    }, settings.FEED_CACHE_TIMEOUT)
+    cache.set(tail_key, data['last'], settings.FEED_CACHE_TIMEOUT)
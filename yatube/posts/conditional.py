@@ -0,0 +1,100 @@
+"""
+Условные GET для лент и страницы поста.
+
+Версия страницы — самая поздняя Post.modified среди постов, которые
+она может показать: один запрос MAX по индексу вместо ленты и шаблона.
+Удаление поста, правки групп и подписки не оставляют следа в
+Post.modified, поэтому для них в кеше хранится отметка времени
+последнего такого изменения, и она тоже входит в версию. Если отметка
+вытеснена из кеша, она считается равной текущему моменту: клиент лишь
+лишний раз получит страницу целиком. Так же отмечается пересчёт
+«Популярного»: от него зависит блок популярных групп на странице группы.
+"""
+from django.core.cache import cache
+from django.db.models import Max, Subquery
+from django.utils import timezone
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .models import Post
+
+STRUCTURE_KEY = 'posts:structure_changed'
+TRENDING_KEY = 'posts:trending_changed'
+
+# Отметки, которые входят в версию страницы, если у scope нет своих.
+MARKS = (STRUCTURE_KEY,)
+
+
+def changed_at(key):
+    changed = cache.get(key)
+    if changed is None:
+        cache.add(key, timezone.now(), None)
+        changed = cache.get(key)
+    return changed
+
+
+def structure_changed():
+    return changed_at(STRUCTURE_KEY)
+
+
+def mark_structure_changed():
+    cache.set(STRUCTURE_KEY, timezone.now(), None)
+
+
+def mark_trending_changed():
+    cache.set(TRENDING_KEY, timezone.now(), None)
+
+
+def all_posts():
+    return Post.objects.all()
+
+
+def group_posts(slug):
+    return Post.objects.filter(group__slug=slug)
+
+
+group_posts.marks = (STRUCTURE_KEY, TRENDING_KEY)
+
+
+def author_posts(username):
+    return Post.objects.filter(author__username=username)
+
+
+def post_author_posts(post_id):
+    """На странице поста есть и число постов автора."""
+    return Post.objects.filter(author_id=Subquery(
+        Post.objects.filter(pk=post_id).values('author_id')[:1]))
+
+
+def last_modified(request, scope, kwargs):
+    """Версия страницы; считается один раз на запрос."""
+    if not hasattr(request, 'posts_last_modified'):
+        newest = scope(**kwargs).order_by().aggregate(
+            newest=Max('modified'))['newest']
+        changed = max(changed_at(key)
+                      for key in getattr(scope, 'marks', MARKS))
+        request.posts_last_modified = max(newest, changed) if newest else (
+            changed)
+    return request.posts_last_modified
+
+
+def conditional_page(scope):
+    """
+    Отвечает 304, если у клиента текущая версия страницы. ETag учитывает
+    пользователя: вошедшему показывают другую шапку и кнопки. Last-Modified
+    отдаётся только анонимам, потому что в нём пользователя не передать.
+    """
+    def etag(request, **kwargs):
+        user_id = request.user.pk if request.user.is_authenticated else 0
+        version = last_modified(request, scope, kwargs).timestamp()
+        return f'{user_id}-{version}'
+
+    def modified(request, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return last_modified(request, scope, kwargs)
+
+    def decorator(view):
+        return vary_on_cookie(
+            condition(etag_func=etag, last_modified_func=modified)(view))
+    return decorator
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+def _count(queryset, field):
+    """Коррелированный подзапрос: число строк queryset на значение field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def recount(user_ids=None):
+    """
+    Пересчитывает счётчики по фактическим данным. Без user_ids
+    пересчитываются все пользователи и число комментариев у всех постов.
+    """
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    UserCounters.objects.bulk_create(
+        (UserCounters(user_id=pk)
+         for pk in users.values_list('pk', flat=True).iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    counters = UserCounters.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(user_id__in=user_ids)
+    # OuterRef('pk') указывает на user_id: это первичный ключ UserCounters.
+    counters.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+    if user_ids is None:
+        recount_comments()
+
+
+def recount_comments(post_ids=None):
+    """Пересчитывает число комментариев у постов post_ids или у всех."""
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    posts.update(comment_count=_count(Comment.objects.all(), 'post'))
+
+
+def _plus(field, delta):
+    """
+    Счётчик плюс delta, но не меньше нуля: разошедшийся с данными
+    счётчик иначе нарушил бы ограничение положительного поля, и удаление
+    упало бы с IntegrityError. Точное значение вернёт recount.
+    """
+    return Greatest(F(field) + delta, 0)
+
+
+def change(user_id, field, delta):
+    """
+    Атомарно меняет счётчик пользователя. Если строки счётчиков ещё нет,
+    её с точными значениями создаст get_counters при первом показе.
+    """
+    UserCounters.objects.filter(user_id=user_id).update(
+        **{field: _plus(field, delta)})
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=_plus('comment_count', delta), modified=timezone.now())
+
+
+def get_counters(user):
+    """Счётчики пользователя для вывода на странице."""
+    try:
+        return UserCounters.objects.get(user=user)
+    except UserCounters.DoesNotExist:
+        recount([user.pk])
+        # Только что созданная строка может ещё не дойти до реплики.
+        return UserCounters.objects.using('default').get(user=user)
@@ -0,0 +1,141 @@
+"""
+Подписки пользователя: множество id авторов, на которых он подписан.
+
+Множество читается одним запросом и хранится в кеше, а за запрос
+достаётся из кеша не больше одного раза, поэтому «подписан ли я на
+автора» — проверка в множестве без обращения к базе, сколько бы кнопок
+подписки ни было на странице. Подписка и отписка сбрасывают множество
+сигналами Follow (см. posts.signals).
+
+follow_many и unfollow_many подписывают на список авторов сразу: число
+запросов не зависит от длины списка. Сигналы Follow внутри bulk()
+ничего не делают, их работу эти функции делают сами, по разу на весь
+список.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from . import counters, pages, timeline, trending
+from .conditional import mark_structure_changed
+from .models import Follow
+
+User = get_user_model()
+
+EMPTY = frozenset()
+
+_local = threading.local()
+
+
+def _key(user_id):
+    return f'posts:follows:{user_id}'
+
+
+def load(user_id):
+    """Множество подписок из кеша, при промахе — из базы."""
+    key = _key(user_id)
+    followed = cache.get(key)
+    if followed is None:
+        followed = frozenset(Follow.objects.filter(
+            user_id=user_id).values_list('author_id', flat=True))
+        cache.set(key, followed, settings.FOLLOW_SET_TIMEOUT)
+    return followed
+
+
+def followed_ids(request):
+    """Подписки пользователя запроса; у анонима их нет."""
+    if not request.user.is_authenticated:
+        return EMPTY
+    if not hasattr(request, '_followed_ids'):
+        request._followed_ids = load(request.user.pk)
+    return request._followed_ids
+
+
+def is_following(request, author_id):
+    return author_id in followed_ids(request)
+
+
+def invalidate(*user_ids):
+    """
+    Сбрасывает множества сразу и ещё раз после фиксации транзакции:
+    иначе параллельный запрос мог бы успеть положить в кеш подписки,
+    прочитанные до неё.
+    """
+    keys = [_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@contextmanager
+def bulk():
+    """
+    Внутри блока обработчики сигналов Follow пропускают учёт подписок:
+    счётчики, ленту и кеши обновляет вызывающий, один раз на пачку.
+    """
+    _local.bulk = True
+    try:
+        yield
+    finally:
+        _local.bulk = False
+
+
+def in_bulk():
+    return getattr(_local, 'bulk', False)
+
+
+def create(pairs):
+    """
+    Создаёт подписки (user_id, author_id) одним bulk_create; уже
+    существующие пропускает ограничение unique_following.
+    """
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in pairs),
+        ignore_conflicts=True,
+    )
+    timeline.backfill_many(pairs)
+    invalidate(*{user_id for user_id, _ in pairs})
+
+
+def _author_ids(user, usernames):
+    return list(User.objects.filter(username__in=set(usernames)).exclude(
+        pk=user.pk).values_list('pk', flat=True))
+
+
+def _changed(user, author_ids):
+    counters.recount([user.pk, *author_ids])
+    invalidate(user.pk)
+    mark_structure_changed()
+    pages.follows_changed([user.pk, *author_ids])
+
+
+def follow_many(user, usernames):
+    """
+    Подписывает user на авторов из списка; неизвестные имена и сам
+    user пропускаются. Возвращает число найденных авторов.
+    """
+    author_ids = _author_ids(user, usernames)
+    if author_ids:
+        new = set(author_ids) - load(user.pk)
+        create([(user.pk, author_id) for author_id in author_ids])
+        trending.record_follows(new)
+        _changed(user, author_ids)
+    return len(author_ids)
+
+
+def unfollow_many(user, usernames):
+    """Отписывает user от авторов из списка, возвращает число авторов."""
+    author_ids = _author_ids(user, usernames)
+    if author_ids:
+        with bulk():
+            Follow.objects.filter(
+                user=user, author_id__in=author_ids).delete()
+        timeline.prune_many(user.pk, author_ids)
+        _changed(user, author_ids)
+    return len(author_ids)
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -8,6 +10,32 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # ImageField уже открыл картинку: размеры известны по заголовку,
+        # пиксели ещё не декодированы.
+        if image and hasattr(image, 'image'):
+            error = uploads.size_error(*image.image.size)
+            if error:
+                raise forms.ValidationError(error)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Загрузку, отвергнутую на лету, ImageField видит обрезанной и
+        # считает испорченной; показываем настоящую причину.
+        error = getattr(self.files.get('image'), 'upload_error', None)
+        if error:
+            self._errors.pop('image', None)
+            self.add_error('image', error)
+        return cleaned_data
+
+    def save(self, commit=True):
+        image = self.cleaned_data.get('image')
+        if 'image' in self.changed_data and isinstance(image, UploadedFile):
+            self.instance.image = uploads.store(image)
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,39 @@
+"""Фрагменты страниц постов, зависящие от пользователя."""
+from core import page_cache
+
+from . import follows
+from .forms import CommentForm
+
+
+@page_cache.register('feed_switcher', 'posts/includes/switcher.html')
+def feed_switcher(request):
+    return {}
+
+
+@page_cache.register('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, username, author_id):
+    return {'username': username,
+            'following': follows.is_following(request, author_id)}
+
+
+@page_cache.register('feed_follow_button',
+                     'posts/includes/feed_follow_button.html')
+def feed_follow_button(request, username, author_id):
+    """Кнопка у поста в ленте: только вошедшим и не у своих постов."""
+    return {
+        'username': username,
+        'visible': request.user.is_authenticated
+        and request.user.pk != author_id,
+        'following': follows.is_following(request, author_id),
+    }
+
+
+@page_cache.register('post_edit_button',
+                     'posts/includes/post_edit_button.html')
+def post_edit_button(request, post_id, author_id):
+    return {'post_id': post_id, 'can_edit': request.user.pk == author_id}
+
+
+@page_cache.register('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'post_id': post_id, 'form': CommentForm()}
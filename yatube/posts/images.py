@@ -0,0 +1,129 @@
+"""
+Производные картинок постов: набор ширин в WebP/AVIF и запасном JPEG
+(PNG для картинок с прозрачностью).
+
+Картинка декодируется один раз, каждая следующая ширина уменьшается из
+предыдущей. Метаданные не переносятся: EXIF-поворот применяется к
+пикселям, а info очищается до сохранения. Ширины больше исходной не
+строятся, так что маленькие картинки не увеличиваются.
+
+Имена файлов выводятся из имени картинки, поэтому в Post.image_variants
+хранится только описание набора: размеры наибольшей производной,
+форматы и ширины.
+"""
+import io
+import json
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+FALLBACK = 'jpeg'
+FALLBACK_ALPHA = 'png'
+# Формат -> (имя для Pillow, MIME-тип, параметры сохранения).
+ENCODINGS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 55, 'speed': 6}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True,
+                                    'progressive': True}),
+    'png': ('PNG', 'image/png', {'optimize': True}),
+}
+
+
+def modern_formats():
+    """
+    Современные форматы, которые умеет кодировать установленный Pillow.
+    AVIF есть в Pillow 11.2+ или с пакетом pillow-avif-plugin.
+    """
+    Image.init()
+    formats = []
+    if 'AVIF' in Image.SAVE:
+        formats.append('avif')
+    if features.check('webp'):
+        formats.append('webp')
+    return [fmt for fmt in formats if fmt in settings.IMAGE_FORMATS]
+
+
+def variant_name(image_name, width, fmt):
+    """
+    Имя производной по полному имени картинки вместе с каталогом и
+    расширением: у cat.jpg и cat.png, как и у одноимённых файлов из
+    разных каталогов, производные не совпадают.
+    """
+    return f'posts/variants/{image_name}-{width}.{fmt}'
+
+
+def _widths(source_width):
+    """Ширины из IMAGE_WIDTHS (по возрастанию), но не больше исходной."""
+    largest = min(source_width, max(settings.IMAGE_WIDTHS))
+    return [width for width in settings.IMAGE_WIDTHS
+            if width < largest] + [largest]
+
+
+def _open(field):
+    field.open('rb')
+    try:
+        image = Image.open(field)
+        # Для JPEG draft декодирует сразу в уменьшенном масштабе.
+        image.draft('RGB', (max(settings.IMAGE_WIDTHS),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    finally:
+        field.close()
+    alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if alpha else 'RGB')
+    image.info = {}
+    return image, alpha
+
+
+def _encode(image, fmt):
+    pillow_format, _, options = ENCODINGS[fmt]
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build(field):
+    """
+    Строит производные картинки и возвращает их описание для
+    Post.image_variants. Файлы с теми же именами перезаписываются.
+    """
+    image, alpha = _open(field)
+    formats = modern_formats() + [FALLBACK_ALPHA if alpha else FALLBACK]
+    widths = _widths(image.width)
+    ratio = image.height / image.width
+    for width in reversed(widths):
+        image = image.resize((width, max(1, round(width * ratio))),
+                             Image.LANCZOS)
+        for fmt in formats:
+            name = variant_name(field.name, width, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, _encode(image, fmt))
+    return json.dumps({
+        'width': widths[-1],
+        'height': max(1, round(widths[-1] * ratio)),
+        'formats': formats,
+        'widths': widths,
+    })
+
+
+def variants(post):
+    """Описание набора производных или None, если их нет."""
+    if not post.image or not post.thumbnails_ready or not (
+            post.image_variants):
+        return None
+    return json.loads(post.image_variants)
+
+
+def url(image_name, width, fmt):
+    return default_storage.url(variant_name(image_name, width, fmt))
+
+
+def srcset(image_name, fmt, widths):
+    return ', '.join(f'{url(image_name, width, fmt)} {width}w'
+                     for width in widths)
@@ -0,0 +1,26 @@
+import os
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «Кого читать» по графу подписок '
+            'для всех пользователей с подписками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Сколько процессов считают рекомендации; по умолчанию '
+                 'по числу ядер.'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должен быть больше нуля.')
+        start = perf_counter()
+        count = suggestions.build(workers=options['workers'])
+        self.stdout.write(f'Рекомендации пересчитаны: {count} '
+                          f'пользователей за {perf_counter() - start:.1f} с')
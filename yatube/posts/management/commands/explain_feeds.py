@@ -0,0 +1,66 @@
+import re
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Comment, Post
+from posts.paginators import NEXT, PREVIOUS, KeysetPaginator
+from posts.timeline import TimelinePaginator
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса: "SCAN TABLE posts_post"
+# (или "SCAN posts_post" в новых SQLite) без "USING ... INDEX".
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?(\w+)(?!.*USING)')
+
+
+def feed_queries():
+    """Основные запросы представлений в том виде, в каком их строят views."""
+    per_page = int(settings.PAGINATE_BY)
+    position = (NEXT, datetime.now(timezone.utc), 1)
+    back = (PREVIOUS, datetime.now(timezone.utc), 1)
+
+    def pages(name, queryset):
+        paginator = KeysetPaginator(queryset, per_page)
+        yield name, paginator.page_queryset(None)
+        yield f'{name} (cursor)', paginator.page_queryset(position)
+        yield f'{name} (cursor back)', paginator.page_queryset(back)
+
+    yield from pages('index', Post.objects.feed())
+    yield from pages('group_list', Post.objects.feed().filter(group_id=1))
+    yield from pages('profile', Post.objects.feed().filter(author_id=1))
+    timeline = TimelinePaginator(User(pk=1), per_page)
+    for position, suffix in ((None, ''), (position, ' (cursor)'),
+                             (back, ' (cursor back)')):
+        inbox, pulled = timeline.sources(position)
+        yield f'follow_index inbox{suffix}', inbox
+        yield f'follow_index pulled{suffix}', pulled
+    yield 'post_detail', Post.objects.feed().filter(pk=1)
+    yield 'post_detail comments', Comment.objects.filter(
+        post_id=1).select_related('author')
+
+
+class Command(BaseCommand):
+    help = 'Печатает EXPLAIN QUERY PLAN основных запросов лент.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Завершиться с ошибкой, если таблица читается целиком.'
+        )
+
+    def handle(self, *args, **options):
+        scans = []
+        for name, queryset in feed_queries():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            for line in plan.splitlines():
+                match = FULL_SCAN.search(line)
+                if match:
+                    scans.append(f'{name}: {match.group(2)}')
+        if scans and options['fail_on_scan']:
+            raise CommandError(
+                'Полный просмотр таблиц: ' + ', '.join(scans))
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты, комментарии, подписки или группы в NDJSON '
+            'или CSV, не загружая таблицу в память целиком.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=bulk.MODELS, default='post',
+            help='Что выгружать.'
+        )
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS, default='ndjson',
+            help='Формат файла.'
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки; по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        model = options['model']
+        rows = bulk.export_rows(model, options['chunk_size'])
+        fields = bulk.fieldnames(model)
+        if options['output'] == '-':
+            bulk.write_rows(rows, sys.stdout, options['format'], fields)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as stream:
+            bulk.write_rows(rows, stream, options['format'], fields)
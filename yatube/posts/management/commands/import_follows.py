@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+FORMATS = ('edges', *bulk.FORMATS)
+
+
+class Command(BaseCommand):
+    help = ('Загружает граф подписок пачками через bulk_create: список '
+            'рёбер «user author», CSV или NDJSON с полями user и author.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с подписками.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению, '
+                 'иначе список рёбер.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько подписок сохранять одной транзакцией.'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных пользователей без пароля, '
+                 'а не пропускать их подписки.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        fmt = options['format'] or self.guess_format(options['path'])
+        importer = bulk.Importer(
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+        )
+        try:
+            with open(options['path'], encoding='utf-8',
+                      newline='') as stream:
+                rows = (bulk.read_edges(stream) if fmt == 'edges'
+                        else bulk.read_rows(stream, fmt))
+                importer.run('follow', rows)
+        except OSError as error:
+            raise CommandError(error)
+        self.stdout.write(f'Загружено: {importer.imported}, '
+                          f'пропущено: {importer.skipped}')
+
+    def guess_format(self, path):
+        for fmt in bulk.FORMATS:
+            if path.endswith(f'.{fmt}'):
+                return fmt
+        return 'edges'
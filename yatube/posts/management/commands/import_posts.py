@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk
+
+
+class Command(BaseCommand):
+    help = ('Загружает посты, комментарии, подписки или группы из NDJSON '
+            'или CSV пачками через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument(
+            '--model', choices=bulk.MODELS, default='post',
+            help='Что загружать.'
+        )
+        parser.add_argument(
+            '--format', choices=bulk.FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей сохранять одной транзакцией.'
+        )
+        parser.add_argument(
+            '--image-dir',
+            help='Каталог с картинками постов; без него пути картинок '
+                 'сохраняются как есть.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько картинок копировать одновременно.'
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных авторов без пароля, '
+                 'а не пропускать их записи.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError(
+                '--batch-size и --workers должны быть больше нуля.')
+        fmt = options['format'] or (
+            'csv' if options['path'].endswith('.csv') else 'ndjson')
+        importer = bulk.Importer(
+            batch_size=options['batch_size'],
+            image_dir=options['image_dir'],
+            workers=options['workers'],
+            create_users=options['create_users'],
+        )
+        try:
+            with open(options['path'], encoding='utf-8',
+                      newline='') as stream:
+                importer.run(options['model'], bulk.read_rows(stream, fmt))
+        except OSError as error:
+            raise CommandError(error)
+        for error in importer.errors:
+            self.stderr.write(f'Пропущено: {error}')
+        self.stdout.write(f'Загружено: {importer.imported}, '
+                          f'пропущено: {importer.skipped}')
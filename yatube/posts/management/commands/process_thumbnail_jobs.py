@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import ThumbnailJob
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры по заданиям из очереди: оставшимся после '
+            'перезапуска сервера или, с --watch, как отдельный процесс. '
+            'Брошенные упавшим исполнителем задания возвращаются в '
+            'очередь.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Повторить задания, завершившиеся ошибкой.'
+        )
+        parser.add_argument(
+            '--watch', action='store_true',
+            help='Не завершаться, а ждать новых заданий.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между проверками очереди в режиме --watch, с.'
+        )
+
+    def process_pending(self):
+        thumbnails.requeue_stale()
+        job_ids = list(ThumbnailJob.objects.filter(
+            status=ThumbnailJob.PENDING
+        ).values_list('pk', flat=True))
+        for job_id in job_ids:
+            thumbnails.process(job_id)
+        return len(job_ids)
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            ThumbnailJob.objects.filter(
+                status=ThumbnailJob.FAILED
+            ).update(status=ThumbnailJob.PENDING, error='')
+        processed = self.process_pending()
+        while options['watch']:
+            time.sleep(options['interval'])
+            processed += self.process_pending()
+        failed = ThumbnailJob.objects.filter(
+            status=ThumbnailJob.FAILED).count()
+        self.stdout.write(f'Обработано: {processed}, с ошибкой: {failed}')
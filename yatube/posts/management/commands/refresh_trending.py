@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Удаляет затухшие оценки «Популярного»; с --rebuild заново '
+            'считает их по постам и комментариям, например после '
+            'import_posts. Запускается периодически, например из cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать оценки по событиям за --days дней.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='За сколько дней учитывать посты и комментарии.'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days должен быть больше нуля.')
+        if options['rebuild']:
+            since = timezone.now() - timedelta(days=options['days'])
+            rows = trending.rebuild(since)
+            self.stdout.write(f'Оценки пересчитаны: {rows}')
+        deleted = trending.prune()
+        self.stdout.write(f'Удалено затухших оценок: {deleted}')
@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.db import migrations
+
+from posts.search import normalizer
+
+BATCH_SIZE = 500
+
+
+def create_fts(apps, schema_editor):
+    """
+    Полнотекстовый индекс FTS5 по основам слов; только для SQLite.
+    Посты индексируются стеммером версии 1. Если стеммер с тех пор
+    изменился, таблица остаётся пустой: её заполнит миграция, поднявшая
+    search.INDEX_VERSION.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+        "body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    normalize = normalizer(1)
+    if normalize is None:
+        return
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').values_list('pk', 'text').iterator(
+        chunk_size=BATCH_SIZE)
+    with schema_editor.connection.cursor() as cursor:
+        batch = list(islice(posts, BATCH_SIZE))
+        while batch:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+                [(pk, normalize(text)) for pk, text in batch])
+            batch = list(islice(posts, BATCH_SIZE))
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    """
+    Для уже загруженных картинок ставятся задания: производные построит
+    manage.py process_thumbnail_jobs, до тех пор выводится исходник.
+    """
+    Post = apps.get_model('posts', 'Post')
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    ThumbnailJob.objects.bulk_create(
+        ThumbnailJob(post_id=pk, image=image)
+        for pk, image in Post.objects.exclude(image='').values_list(
+            'pk', 'image').iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, verbose_name='Производные картинки'),
+        ),
+        migrations.RunPython(queue_existing_images,
+                             migrations.RunPython.noop),
+    ]
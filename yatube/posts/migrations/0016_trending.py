@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingGroup',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Group')),
+                ('rank', models.FloatField(verbose_name='Ранг')),
+            ],
+            options={
+                'verbose_name': 'Оценка популярности группы',
+                'verbose_name_plural': 'Оценки популярности групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post')),
+                ('rank', models.FloatField(verbose_name='Ранг')),
+            ],
+            options={
+                'verbose_name': 'Оценка популярности поста',
+                'verbose_name_plural': 'Оценки популярности постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingpost',
+            index=models.Index(fields=['-rank'], name='trending_post_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trendinggroup',
+            index=models.Index(fields=['-rank'], name='trending_group_rank_idx'),
+        ),
+    ]
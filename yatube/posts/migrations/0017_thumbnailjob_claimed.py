@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='claimed',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Взято в работу'),
+        ),
+    ]
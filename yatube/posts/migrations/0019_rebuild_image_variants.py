@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def rebuild_variants(apps, schema_editor):
+    """
+    Имена производных теперь строятся из полного имени картинки, и
+    прежние файлы по ним не находятся. Производные строятся заново, до
+    тех пор выводится исходник; одно задание на файл.
+    """
+    Post = apps.get_model('posts', 'Post')
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    posts = Post.objects.exclude(image='').exclude(image_variants='')
+    jobs = dict(posts.values_list('image', 'pk').iterator())
+    posts.update(thumbnails_ready=False, image_variants='',
+                 modified=timezone.now())
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(post_id=pk, image=image)
+         for image, pk in jobs.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_timeline_pub_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_variants, migrations.RunPython.noop),
+    ]
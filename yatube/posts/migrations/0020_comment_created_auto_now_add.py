@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+# Модель Comment задаёт created с auto_now_add, а 0005_comment создала поле
+# с auto_now, и миграции для этой правки не было. Операция только
+# приводит состояние миграций к модели, схема базы не меняется.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_rebuild_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата и время публикации'),
+        ),
+    ]
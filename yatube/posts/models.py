@@ -14,6 +14,24 @@ class Group(models.Model):
         return self.title
 
 
+# Поля поста, которые выводят шаблоны лент.
+FEED_FIELDS = (
+    'text', 'pub_date', 'image', 'thumbnails_ready', 'image_variants',
+    'comment_count',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """
+        Посты для лент: автор и группа подтягиваются одним запросом
+        и выбираются только выводимые в шаблонах поля.
+        """
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст',
                             help_text='Введите текст поста')
@@ -33,11 +51,55 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры построены',
+        default=False,
+        editable=False
+    )
+    # Описание производных картинки в JSON, см. posts.images.
+    image_variants = models.TextField(
+        'Производные картинки',
+        blank=True,
+        editable=False
+    )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разослан в ленты подписчиков',
+        default=False,
+        editable=False
+    )
+    # Меняется при правке поста и при всём, что меняет его вывод:
+    # комментариях и готовности миниатюр. По нему отвечают на условные GET.
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['-modified'], name='post_modified_idx'),
+            models.Index(fields=['author', '-modified'],
+                         name='post_author_modified_idx'),
+            models.Index(fields=['group', '-modified'],
+                         name='post_group_modified_idx'),
+            models.Index(fields=['image'], name='post_image_idx'),
+            # Нерассылавшиеся посты, которые лента подписок читает сама.
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_pull_idx',
+                         condition=models.Q(fanned_out=False)),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -55,9 +117,13 @@ class Comment(models.Model):
                                    auto_now_add=True)
 
     class Meta:
-        ordering = ['post']
+        ordering = ['post_id', 'created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -76,3 +142,111 @@ class Follow(models.Model):
         verbose_name_plural = 'Подписки'
         constraints = [constraints.UniqueConstraint(fields=['user', 'author'],
                                                     name='unique_following')]
+
+
+class TimelineEntry(models.Model):
+    """Пост автора в ленте подписок пользователя (fan-out-on-write)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    # Копия Post.pub_date: лента листается по индексу этой таблицы.
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [constraints.UniqueConstraint(
+            fields=['user', 'post'], name='unique_timeline_entry')]
+        indexes = [
+            models.Index(fields=['user', 'author']),
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class ThumbnailJob(models.Model):
+    """Задание на построение миниатюр картинки поста."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='thumbnail_jobs')
+    image = models.CharField('Картинка', max_length=100)
+    status = models.CharField('Статус', max_length=10,
+                              choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    claimed = models.DateTimeField('Взято в работу', null=True,
+                                   editable=False)
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
+        indexes = [models.Index(fields=['status', 'created'],
+                                name='thumbnail_job_status_idx')]
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи (см. counters.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='counters')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+        indexes = [models.Index(fields=['-followers_count'],
+                                name='counters_followers_idx')]
+
+
+class FollowSuggestions(models.Model):
+    """Кого читать: id авторов по убыванию оценки (см. suggestions.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='follow_suggestions')
+    authors = models.TextField('Авторы', default='[]')
+    updated = models.DateTimeField('Дата пересчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рекомендации подписок'
+        verbose_name_plural = 'Рекомендации подписок'
+
+
+class TrendingPost(models.Model):
+    """Затухающая оценка поста для ленты «Популярное» (см. trending.py)."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='trending')
+    rank = models.FloatField('Ранг')
+
+    class Meta:
+        verbose_name = 'Оценка популярности поста'
+        verbose_name_plural = 'Оценки популярности постов'
+        indexes = [models.Index(fields=['-rank'],
+                                name='trending_post_rank_idx')]
+
+
+class TrendingGroup(models.Model):
+    """Затухающая оценка группы, см. TrendingPost."""
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True, related_name='trending')
+    rank = models.FloatField('Ранг')
+
+    class Meta:
+        verbose_name = 'Оценка популярности группы'
+        verbose_name_plural = 'Оценки популярности групп'
+        indexes = [models.Index(fields=['-rank'],
+                                name='trending_group_rank_idx')]
@@ -0,0 +1,118 @@
+"""
+Области кеша страниц постов (см. core.page_cache).
+
+Функции index, group_posts, profile, post_detail и trending_posts
+перечисляют области, от которых зависит страница, а сигналы (см.
+posts.signals) сбрасывают только области, которые задело изменение:
+новый комментарий не трогает страницы других постов и профили других
+авторов. Правки групп и пользователей видны почти на всех страницах и
+сбрасывают кеш целиком.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core import page_cache
+
+from .models import Post
+
+User = get_user_model()
+
+INDEX = 'posts:index'
+TRENDING = 'posts:trending'
+# Блок популярных групп на странице каждой группы.
+GROUPS = 'posts:groups'
+
+
+def _post(post_id):
+    return f'posts:post:{post_id}'
+
+
+def _author(author_id):
+    return f'posts:author:{author_id}'
+
+
+def _profile(username):
+    return f'posts:profile:{username}'
+
+
+def _group(slug):
+    return f'posts:group:{slug}'
+
+
+def _author_key(post_id):
+    return f'posts:author_of:{post_id}'
+
+
+def remember_author(post):
+    """Автор поста не меняется, поэтому хранится в кеше без срока."""
+    cache.set(_author_key(post.pk), post.author_id, None)
+
+
+def index():
+    return [INDEX]
+
+
+def group_posts(slug):
+    return [_group(slug), GROUPS]
+
+
+def profile(username):
+    return [_profile(username)]
+
+
+def post_detail(post_id):
+    """
+    На странице поста есть число постов автора. Пока кеш не знает
+    автора поста, страница не кешируется: его запомнит представление.
+    """
+    author_id = cache.get(_author_key(post_id))
+    if author_id is None:
+        return None
+    return [_post(post_id), _author(author_id)]
+
+
+def trending_posts():
+    return [TRENDING]
+
+
+def post_changed(post, counted=False, moved=False):
+    """
+    Сбрасывает страницы, где виден пост. counted — изменилось число
+    постов автора, оно есть на страницах всех его постов; moved — пост
+    мог перейти в другую группу, а прежняя неизвестна, поэтому
+    сбрасываются страницы всех групп.
+    """
+    scopes = [INDEX, TRENDING, _post(post.pk),
+              _profile(post.author.username)]
+    if post.group_id:
+        scopes.append(_group(post.group.slug))
+    if counted:
+        scopes.append(_author(post.author_id))
+    if moved:
+        scopes.append(GROUPS)
+    page_cache.invalidate(*scopes)
+
+
+def post_deleted(post):
+    post_changed(post, counted=True)
+    cache.delete(_author_key(post.pk))
+
+
+def comments_changed(post_id):
+    """Комментарии видны на странице поста, а их число — в лентах."""
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is not None:
+        post_changed(post)
+
+
+def follows_changed(user_ids):
+    """Подписки и подписчики выводятся в профилях."""
+    usernames = User.objects.filter(pk__in=user_ids).values_list(
+        'username', flat=True)
+    page_cache.invalidate(*map(_profile, usernames))
+
+
+def trending_changed(groups=True):
+    """groups — изменились и оценки групп, а не только постов."""
+    page_cache.invalidate(TRENDING, *([GROUPS] if groups else []))
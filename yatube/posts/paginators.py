@@ -0,0 +1,106 @@
+import base64
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, post):
+    """Упаковывает направление и ключ (pub_date, id) в непрозрачный курсор."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор; для испорченного курсора возвращает None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def keyset_page(queryset, position, limit, pk='pk'):
+    """
+    Срез queryset по ключу (pub_date, pk) от позиции position: первая
+    страница, записи после ключа (NEXT) или перед ним (PREVIOUS), не
+    больше limit. Избыточное условие pub_date <= / >= даёт SQLite
+    границу диапазона по индексу, без него OR-условие ключа читалось бы
+    с начала индекса.
+    """
+    if position is None:
+        return queryset.order_by('-pub_date', f'-{pk}')[:limit]
+    direction, pub_date, key = position
+    if direction == NEXT:
+        return queryset.filter(
+            Q(pub_date__lte=pub_date),
+            Q(pub_date__lt=pub_date)
+            | Q(pub_date=pub_date, **{f'{pk}__lt': key})
+        ).order_by('-pub_date', f'-{pk}')[:limit]
+    return queryset.filter(
+        Q(pub_date__gte=pub_date),
+        Q(pub_date__gt=pub_date)
+        | Q(pub_date=pub_date, **{f'{pk}__gt': key})
+    ).order_by('pub_date', pk)[:limit]
+
+
+class KeysetPaginator(Paginator):
+    """
+    Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница читается одним диапазонным запросом с LIMIT per_page + 1,
+    лишняя запись лишь показывает, есть ли страница дальше. Абсолютный номер
+    страницы при такой навигации неизвестен, поэтому number и num_pages
+    задаются относительно текущей страницы: этого достаточно, чтобы
+    has_next/has_previous у Page работали как обычно.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def page_queryset(self, position):
+        """Запрос одной страницы, на запись больше per_page."""
+        return keyset_page(self.object_list, position, self.per_page + 1)
+
+    def _fetch(self, position):
+        rows = list(self.page_queryset(position))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if position is None:
+            return rows, False, has_more
+        if position[0] == NEXT:
+            return rows, True, has_more
+        return rows[::-1], has_more, True
+
+    def get_page(self, cursor):
+        """Возвращает страницу по курсору, при ошибке в курсоре — первую."""
+        position = decode_cursor(cursor) if cursor else None
+        rows, has_previous, has_next = self._fetch(position)
+        if not rows and position is not None:
+            return self.get_page(None)
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(PREVIOUS, rows[0])
+        if rows and has_next:
+            self.next_cursor = encode_cursor(NEXT, rows[-1])
+        number = 2 if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+        return self._get_page(rows, number, self)
@@ -0,0 +1,150 @@
+"""
+Полнотекстовый поиск постов.
+
+В SQLite посты индексируются в таблице FTS5 по основам слов (см.
+stemmer), и поиск ранжирует их по BM25. Для других баз, в том числе
+PostgreSQL профиля production, индекса нет: поиск проверяет каждый пост
+через icontains (LIKE), то есть читает таблицу постов целиком, о чём
+один раз на процесс пишет предупреждение в лог.
+"""
+import logging
+import re
+from functools import lru_cache
+
+from django.db import connection
+
+from .models import Post
+from .stemmer import stem
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'posts_post_fts'
+BATCH_SIZE = 500
+# Версия формата индекса. Правка стеммера меняет основы слов в индексе:
+# вместе с ней версия поднимается и добавляется миграция, которая
+# перестраивает индекс, как 0011_post_fts строит индекс версии 1.
+INDEX_VERSION = 1
+
+WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Текст поста в виде основ слов: так он хранится в индексе."""
+    return ' '.join(stem(word) for word in WORD.findall(text.lower()))
+
+
+def normalizer(version):
+    """
+    normalize для индекса версии version или None, если стеммер с тех
+    пор изменился: индекс в устаревшем формате строить незачем.
+    """
+    return normalize if version == INDEX_VERSION else None
+
+
+def available():
+    """Индекс FTS5 есть только в SQLite; на других базах — поиск LIKE."""
+    return connection.vendor == 'sqlite'
+
+
+def index_post(post):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+            [post.pk, normalize(post.text)])
+
+
+def unindex_post(post_id):
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def index_rows(rows):
+    """Индексирует пары (pk, text) новых постов одним executemany."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+            [(pk, normalize(text)) for pk, text in rows])
+
+
+def rebuild():
+    """Заново индексирует все посты; без индекса FTS5 ничего не делает."""
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    posts = Post.objects.values_list('pk', 'text').order_by('pk')
+    batch = []
+    for row in posts.iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            index_rows(batch)
+            batch = []
+    if batch:
+        index_rows(batch)
+
+
+@lru_cache(maxsize=None)
+def _warn_without_index(vendor):
+    logger.warning('Полнотекстового индекса для %s нет, поиск читает все '
+                   'посты через LIKE.', vendor)
+
+
+class SearchResults:
+    """
+    Результаты поиска, упорядоченные по BM25. Paginator берёт из них
+    срезы: каждый срез — один запрос к индексу с LIMIT/OFFSET и выборка
+    найденных постов по первичному ключу.
+    """
+
+    def __init__(self, match):
+        self.match = match
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s', [self.match])
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        start, stop = item.start or 0, item.stop
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query):
+    """
+    Посты, содержащие все слова запроса в любой грамматической форме.
+    Каждая основа ищется как префикс, поэтому подходят и недописанные слова.
+    """
+    stems = normalize(query).split()
+    if not stems:
+        return Post.objects.none()
+    if not available():
+        _warn_without_index(connection.vendor)
+        posts = Post.objects.feed()
+        for word in WORD.findall(query):
+            posts = posts.filter(text__icontains=word)
+        return posts
+    return SearchResults(' '.join(f'"{word}"*' for word in stems))
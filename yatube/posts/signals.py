@@ -0,0 +1,199 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import page_cache
+
+from . import (comments, counters, follows, pages, search, timeline,
+               trending)
+from .caching import bump_feed_generation
+from .conditional import mark_structure_changed
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_feeds(sender, **kwargs):
+    """Сбрасывает кеш лент при изменении выводимых в них данных."""
+    bump_feed_generation()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    """Рассылает новый пост в ленты подписчиков автора."""
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if follows.in_bulk():
+        return
+    timeline.prune(instance)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def reset_follow_set(sender, instance, **kwargs):
+    if follows.in_bulk():
+        return
+    follows.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id:
+        counters.change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    if instance.post_id:
+        counters.change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change(instance.author_id, 'followers_count', 1)
+        counters.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    if follows.in_bulk():
+        return
+    counters.change(instance.author_id, 'followers_count', -1)
+    counters.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def reset_comment_thread(sender, instance, created, **kwargs):
+    """Новые комментарии дописывает add_comment, правка сбрасывает ветку."""
+    if not created and instance.post_id:
+        comments.invalidate(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def drop_comment_thread(sender, instance, **kwargs):
+    if instance.post_id:
+        comments.invalidate(instance.post_id)
+
+
+@receiver(post_delete, sender=Post)
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Follow)
+@receiver([post_save, post_delete], sender=User)
+def change_structure(sender, update_fields=None, **kwargs):
+    """
+    Изменения, не видные по Post.modified, сбрасывают версии страниц:
+    так, имя автора выводится рядом с каждым его постом.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if sender is Follow and follows.in_bulk():
+        return
+    mark_structure_changed()
+
+
+@receiver(post_save, sender=Comment)
+def touch_commented_post(sender, instance, created, **kwargs):
+    """Новые и удалённые комментарии отмечает change_comment_count."""
+    if not created and instance.post_id:
+        Post.objects.filter(pk=instance.post_id).update(
+            modified=timezone.now())
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_pages(sender, instance, created, raw=False, **kwargs):
+    """Правка могла перенести пост в другую группу."""
+    if raw:
+        return
+    if created:
+        pages.remember_author(instance)
+    pages.post_changed(instance, counted=created, moved=not created)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    pages.post_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if instance.post_id and not raw:
+        pages.comments_changed(instance.post_id)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_follow_pages(sender, instance, raw=False, **kwargs):
+    if not raw and not follows.in_bulk():
+        pages.follows_changed([instance.user_id, instance.author_id])
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_pages(sender, update_fields=None, **kwargs):
+    """
+    Группы и имена авторов видны почти на всех страницах, поэтому их
+    правка сбрасывает кеш страниц целиком. Вход пользователя обновляет
+    только last_login.
+    """
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    page_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Post)
+def trend_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record([(instance.pk, instance.group_id)], 'post')
+
+
+@receiver(post_save, sender=Comment)
+def trend_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id:
+        trending.record([(instance.post_id, instance.post.group_id)],
+                        'comment')
+
+
+@receiver(post_save, sender=Follow)
+def trend_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        trending.record_follows([instance.author_id])
@@ -0,0 +1,107 @@
+"""Стеммер Snowball для русского языка."""
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'),
+                     ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ((), ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый',
+                  'ой', 'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому',
+                  'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+         'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+         'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+         'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ((), ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи',
+             'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+             'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию',
+             'ью', 'ю', 'ия', 'ья', 'я'))
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def _regions(word):
+    """Начала областей RV и R2 (в терминах Snowball)."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _by_length(endings):
+    preceded, plain = endings
+    return sorted(preceded + plain, key=len, reverse=True), set(plain)
+
+
+PERFECTIVE_GERUND, ADJECTIVE, PARTICIPLE, REFLEXIVE, VERB, NOUN = map(
+    _by_length,
+    (PERFECTIVE_GERUND, ADJECTIVE, PARTICIPLE, REFLEXIVE, VERB, NOUN))
+
+
+def _strip(word, endings):
+    """
+    Отрезает самое длинное из окончаний. Окончания первой группы
+    отрезаются, только если перед ними стоит «а» или «я».
+    Возвращает None, если отрезать нечего.
+    """
+    ordered, plain = endings
+    for ending in ordered:
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if ending in plain or stem.endswith(('а', 'я')):
+            return stem
+        return None
+    return None
+
+
+def _step1(word):
+    stem = _strip(word, PERFECTIVE_GERUND)
+    if stem is not None:
+        return stem
+    stem = _strip(word, REFLEXIVE)
+    if stem is not None:
+        word = stem
+    stem = _strip(word, ADJECTIVE)
+    if stem is not None:
+        participle = _strip(stem, PARTICIPLE)
+        return stem if participle is None else participle
+    for endings in (VERB, NOUN):
+        stem = _strip(word, endings)
+        if stem is not None:
+            return stem
+    return word
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    prefix, word = word[:rv], word[rv:]
+    word = _step1(word)
+    if word.endswith('и'):
+        word = word[:-1]
+    for ending in DERIVATIONAL:
+        if word.endswith(ending) and len(word) - len(ending) >= r2 - rv:
+            word = word[:-len(ending)]
+            break
+    if word.endswith(SUPERLATIVE):
+        word = word[:-4] if word.endswith('ейше') else word[:-3]
+    if word.endswith('нн'):
+        word = word[:-1]
+    elif word.endswith('ь'):
+        word = word[:-1]
+    return prefix + word
@@ -0,0 +1,203 @@
+"""
+Кого читать: рекомендации авторов по графу подписок.
+
+Рекомендации строит manage.py build_follow_suggestions, а страница
+suggestions только читает готовый список. Граф читается из Follow один
+раз и хранится в плотной форме CSR: пользователи нумеруются подряд,
+подписки каждого лежат отрезком общего массива array('i'), а offsets
+указывает начало отрезка. Так же устроен и обратный граф (подписчики).
+
+Оценка кандидата складывается из двух частей:
+- друзья друзей: сколько авторов из подписок пользователя читают
+  кандидата;
+- совместные подписки: насколько кандидат похож на авторов, которых
+  пользователь читает, — косинус по множествам их подписчиков. Для
+  каждого автора заранее считаются SUGGESTIONS_SIMILAR самых похожих.
+
+Списки длиннее SUGGESTIONS_MAX_DEGREE обрезаются: подписчики очень
+популярного автора почти ничего не говорят о сходстве, а перебор их
+подписок занимал бы основное время. Обе стадии делятся на части по
+числу ядер; процессы получают граф при fork и в базу не ходят.
+"""
+import heapq
+import json
+import math
+import multiprocessing
+import os
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import follows
+from .models import Follow, FollowSuggestions
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+# Граф для процессов-исполнителей: задаётся до fork.
+_graph = None
+_similar = None
+
+
+class Graph:
+    """Подписки и подписчики в форме CSR по плотным номерам."""
+
+    def __init__(self, ids, edges):
+        self.ids = ids
+        index = {pk: i for i, pk in enumerate(ids)}
+        pairs = [(index[user], index[author]) for user, author in edges]
+        self.out_offsets, self.out_targets = _csr(len(ids), pairs)
+        self.in_offsets, self.in_targets = _csr(
+            len(ids), ((author, user) for user, author in pairs))
+
+    @classmethod
+    def load(cls):
+        ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        edges = Follow.objects.order_by().values_list('user_id', 'author_id')
+        return cls(ids, edges.iterator(chunk_size=10000))
+
+    def following(self, node):
+        start, end = self.out_offsets[node], self.out_offsets[node + 1]
+        return self.out_targets[start:end]
+
+    def followers(self, node):
+        start, end = self.in_offsets[node], self.in_offsets[node + 1]
+        return self.in_targets[start:end]
+
+    def out_degree(self, node):
+        return self.out_offsets[node + 1] - self.out_offsets[node]
+
+    def in_degree(self, node):
+        return self.in_offsets[node + 1] - self.in_offsets[node]
+
+
+def _csr(size, pairs):
+    """Смещения и соседи по парам (узел, сосед) в произвольном порядке."""
+    pairs = sorted(pairs)
+    offsets = array('i', bytes(4 * (size + 1)))
+    for node, _ in pairs:
+        offsets[node + 1] += 1
+    for node in range(size):
+        offsets[node + 1] += offsets[node]
+    return offsets, array('i', (target for _, target in pairs))
+
+
+def similar_authors(authors):
+    """
+    Для каждого автора — SUGGESTIONS_SIMILAR самых похожих по
+    совместным подписчикам: [(автор, [(похожий, косинус), ...]), ...].
+    """
+    graph, limit = _graph, settings.SUGGESTIONS_MAX_DEGREE
+    result = []
+    for author in authors:
+        together = Counter()
+        for follower in graph.followers(author)[:limit]:
+            together.update(graph.following(follower)[:limit])
+        del together[author]
+        degree = graph.in_degree(author)
+        scored = ((other, count / math.sqrt(degree * graph.in_degree(other)))
+                  for other, count in together.items())
+        result.append((author, heapq.nlargest(
+            settings.SUGGESTIONS_SIMILAR, scored, key=lambda item: item[1])))
+    return result
+
+
+def suggest(users):
+    """Лучшие кандидаты для пользователей: [(номер, [номера]), ...]."""
+    graph, limit = _graph, settings.SUGGESTIONS_MAX_DEGREE
+    result = []
+    for user in users:
+        followed = graph.following(user)
+        scores = Counter()
+        for author in followed[:limit]:
+            scores.update(graph.following(author)[:limit])
+            for other, similarity in _similar.get(author, ()):
+                scores[other] += similarity
+        for author in (user, *followed):
+            scores.pop(author, None)
+        result.append((user, [candidate for candidate, _ in heapq.nlargest(
+            settings.SUGGESTIONS_PER_USER, scores.items(),
+            key=lambda item: item[1])]))
+    return result
+
+
+def _chunks(nodes, workers):
+    size = max(1, math.ceil(len(nodes) / (workers * 4)))
+    return [nodes[i:i + size] for i in range(0, len(nodes), size)]
+
+
+def _run(func, nodes, workers):
+    """func по частям nodes: в этом процессе или в workers процессах."""
+    if workers == 1:
+        return func(nodes)
+    # Соединения с базой не должны достаться процессам при fork.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(workers) as pool:
+        return [item for part in pool.map(func, _chunks(nodes, workers))
+                for item in part]
+
+
+def build(workers=None):
+    """
+    Пересчитывает рекомендации всех пользователей, у которых есть
+    подписки, и возвращает число сохранённых списков.
+    """
+    global _graph, _similar
+    workers = workers or os.cpu_count() or 1
+    started = timezone.now()
+    _graph = graph = Graph.load()
+    try:
+        authors = [node for node in range(len(graph.ids))
+                   if graph.in_degree(node)]
+        _similar = dict(_run(similar_authors, authors, workers))
+        users = [node for node in range(len(graph.ids))
+                 if graph.out_degree(node)]
+        suggestions = _run(suggest, users, workers)
+    finally:
+        _graph = _similar = None
+    save(graph.ids, suggestions, started)
+    return len(suggestions)
+
+
+def save(ids, suggestions, started):
+    """
+    Пишет списки пачками; строки, не обновлённые с начала пересчёта,
+    принадлежат пользователям без подписок и удаляются.
+    """
+    for i in range(0, len(suggestions), BATCH_SIZE):
+        batch = suggestions[i:i + BATCH_SIZE]
+        rows = [FollowSuggestions(
+            user_id=ids[user],
+            authors=json.dumps([ids[author] for author in authors]))
+            for user, authors in batch]
+        with transaction.atomic():
+            FollowSuggestions.objects.filter(
+                user_id__in=[row.user_id for row in rows]).delete()
+            FollowSuggestions.objects.bulk_create(rows)
+    FollowSuggestions.objects.filter(updated__lt=started).delete()
+
+
+def for_user(request, limit):
+    """
+    Авторы для страницы рекомендаций. Те, на кого пользователь уже
+    подписался после пересчёта, пропускаются; без готового списка
+    предлагаются самые читаемые авторы.
+    """
+    user = request.user
+    skip = follows.followed_ids(request) | {user.pk}
+    stored = FollowSuggestions.objects.filter(user=user).values_list(
+        'authors', flat=True).first()
+    if stored:
+        ids = [pk for pk in json.loads(stored) if pk not in skip][:limit]
+        authors = User.objects.filter(pk__in=ids).select_related('counters')
+        return sorted(authors, key=lambda author: ids.index(author.pk))
+    popular = User.objects.filter(
+        counters__followers_count__gt=0).select_related('counters').order_by(
+        '-counters__followers_count')[:limit + len(skip)]
+    return [author for author in popular if author.pk not in skip][:limit]
@@ -0,0 +1,32 @@
+from django import template
+
+from posts import images
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(post, width):
+    """
+    Картинка поста через <picture>: браузер сам выбирает формат и ширину
+    по srcset и sizes. width — ширина места под картинку на странице, px.
+    Пока производных нет, выводится исходный файл.
+    """
+    variants = images.variants(post)
+    if variants is None:
+        return {'src': post.image.url}
+    *modern, fallback = variants['formats']
+    widths = variants['widths']
+    name = post.image.name
+    return {
+        'sources': [
+            {'type': images.ENCODINGS[fmt][1],
+             'srcset': images.srcset(name, fmt, widths)}
+            for fmt in modern
+        ],
+        'src': images.url(name, widths[-1], fallback),
+        'srcset': images.srcset(name, fallback, widths),
+        'sizes': f'(max-width: {width}px) 100vw, {width}px',
+        'width': variants['width'],
+        'height': variants['height'],
+    }
@@ -0,0 +1,142 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.testing import TestCase
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def read(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author',
+                                              first_name='Лев',
+                                              last_name='Толстой')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_slug',
+                                         description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(15)
+        )
+        cls.post = Post.objects.latest('pk')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.authorized_reader = Client()
+        self.authorized_reader.force_login(self.reader)
+
+    def test_feeds(self):
+        """Проверка: ленты отдают посты страницами по курсору."""
+        feeds = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.author.username]),
+            reverse('posts:api_follow'),
+        )
+        for url in feeds:
+            with self.subTest(url=url):
+                response = self.authorized_reader.get(url)
+                self.assertEqual(response['Content-Type'],
+                                 'application/json; charset=utf-8')
+                first = read(response)
+                self.assertEqual(len(first['results']), 10)
+                self.assertEqual(first['results'][0]['id'], self.post.pk)
+                self.assertIsNone(first['previous'])
+                second = read(self.authorized_reader.get(
+                    url, {'cursor': first['next']}))
+                self.assertEqual(len(second['results']), 5)
+                self.assertIsNone(second['next'])
+                ids = [post['id'] for post in first['results']
+                       + second['results']]
+                self.assertEqual(len(set(ids)), 15)
+
+    def test_fields(self):
+        """Проверка: fields= оставляет только запрошенные поля."""
+        data = read(self.client.get(reverse('posts:api_index'),
+                                    {'fields': 'id,author_name', 'limit': 2}))
+        self.assertEqual(data['results'][0],
+                         {'id': self.post.pk, 'author_name': 'Лев Толстой'})
+        self.assertEqual(len(data['results']), 2)
+        response = self.client.get(reverse('posts:api_index'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_thumbnails(self):
+        """Проверка: адреса производных картинки абсолютные по форматам."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой',
+            image='posts/picture.jpg', thumbnails_ready=True,
+            image_variants=json.dumps({'width': 640, 'height': 480,
+                                       'formats': ['webp', 'jpeg'],
+                                       'widths': [320, 640]}))
+        detail = self.client.get(
+            reverse('posts:api_post_detail', args=[post.pk])).json()
+        feed = read(self.client.get(reverse('posts:api_index')))
+        for data in (detail, feed['results'][0]):
+            with self.subTest(data=data['id']):
+                self.assertEqual(
+                    data['thumbnails']['webp']['320'],
+                    'http://testserver/media/posts/variants/posts/'
+                    'picture.jpg-320.webp')
+                self.assertEqual(set(data['thumbnails']), {'webp', 'jpeg'})
+                self.assertEqual(data['image'],
+                                 'http://testserver/media/posts/picture.jpg')
+
+    def test_post_detail_and_comments(self):
+        """Проверка: пост и его комментарии по курсору."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader,
+                    text=f'Комментарий {i}')
+            for i in range(3)
+        )
+        data = self.client.get(
+            reverse('posts:api_post_detail', args=[self.post.pk])).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertIsNone(data['thumbnails'])
+        url = reverse('posts:api_comments', args=[self.post.pk])
+        first = read(self.client.get(url, {'limit': 2}))
+        self.assertEqual([comment['text'] for comment in first['results']],
+                         ['Комментарий 0', 'Комментарий 1'])
+        second = read(self.client.get(url, {'limit': 2,
+                                            'cursor': first['next']}))
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+    def test_errors(self):
+        """Проверка: ошибки приходят в JSON с нужным кодом."""
+        cases = (
+            (reverse('posts:api_group', args=['missing']), {}, 404),
+            (reverse('posts:api_profile', args=['missing']), {}, 404),
+            (reverse('posts:api_post_detail', args=[0]), {}, 404),
+            (reverse('posts:api_comments', args=[0]), {}, 404),
+            (reverse('posts:api_follow'), {}, 401),
+            (reverse('posts:api_index'), {'limit': 'много'}, 400),
+            (reverse('posts:api_index'), {'limit': 1000}, 400),
+            (reverse('posts:api_index'), {'cursor': '%%'}, 400),
+            (reverse('posts:api_profile', args=['test_author']),
+             {'cursor': 'abc'}, 400),
+        )
+        for url, params, status in cases:
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_single_query_page(self):
+        """Проверка: анонимная страница ленты — один SQL-запрос."""
+        with self.assertNumQueries(1):
+            read(self.client.get(reverse('posts:api_index')))
@@ -0,0 +1,206 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from core.testing import TestCase
+from posts import bulk
+from posts.models import (Comment, Follow, FollowSuggestions, Group, Post,
+                          UserCounters)
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class ExplainFeedsCommandTest(TestCase):
+    def test_feeds_use_indexes(self):
+        """Проверка: запросы лент не читают таблицы целиком."""
+        out = StringIO()
+        call_command('explain_feeds', '--fail-on-scan', stdout=out)
+        self.assertIn('post_pub_date_id_idx', out.getvalue())
+        self.assertIn('comment_post_created_idx', out.getvalue())
+
+
+class RecountCommandTest(TestCase):
+    def test_recount_fixes_drift(self):
+        """Проверка: recount восстанавливает сбитые счётчики."""
+        user = User.objects.create_user(username='test_user')
+        post = Post.objects.create(author=user, text='Тестовый пост')
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        UserCounters.objects.filter(user=user).update(posts_count=42)
+        Post.objects.filter(pk=post.pk).update(comment_count=0)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(UserCounters.objects.get(user=user).posts_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+
+class BulkCommandsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание')
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f'Пост номер {i}')
+            for i in range(5)
+        ]
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def export(self, model, fmt):
+        path = os.path.join(self.dir.name, f'{model}.{fmt}')
+        call_command('export_posts', model=model, format=fmt, output=path)
+        return path
+
+    def test_round_trip(self):
+        """Проверка: выгрузка загружается обратно в пустую базу."""
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(fmt=fmt):
+                paths = [self.export(model, fmt)
+                         for model in ('group', 'post', 'comment', 'follow')]
+                dates = list(Post.objects.values_list('pub_date', flat=True))
+                Post.objects.all().delete()
+                Group.objects.all().delete()
+                Follow.objects.all().delete()
+                for model, path in zip(('group', 'post', 'comment', 'follow'),
+                                       paths):
+                    call_command('import_posts', path, model=model,
+                                 batch_size=2, stdout=StringIO())
+                self.assertEqual(
+                    list(Post.objects.values_list('pub_date', flat=True)),
+                    dates)
+                self.assertEqual(
+                    Post.objects.filter(group__slug='test-slug').count(), 5)
+                self.assertEqual(Comment.objects.count(), 1)
+                self.assertEqual(len(search_posts('номера')), 5)
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.author).exists())
+                counters = UserCounters.objects.get(user=self.author)
+                self.assertEqual(counters.posts_count, 5)
+                self.assertEqual(counters.followers_count, 1)
+
+    def test_unknown_authors(self):
+        """Проверка: неизвестные авторы пропускаются или создаются."""
+        path = self.export('post', 'ndjson')
+        Post.objects.all().delete()
+        self.author.delete()
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertIn('пропущено: 5', out.getvalue())
+        call_command('import_posts', path, create_users=True,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.filter(
+            author__username='author').count(), 5)
+        # Повторная загрузка того же файла не создаёт дублей.
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_import_comments(self):
+        """Проверка: комментарий без поста загружается, прочие не задеты."""
+        path = os.path.join(self.dir.name, 'comment.ndjson')
+        rows = [
+            {'post': self.posts[1].pk, 'author': 'reader', 'text': 'Первый'},
+            {'post': None, 'author': 'reader', 'text': 'Без поста'},
+            {'post': 10 ** 6, 'author': 'reader', 'text': 'Пропущенный'},
+        ]
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.writelines(json.dumps(row) + '\n' for row in rows)
+        Post.objects.filter(pk=self.posts[2].pk).update(comment_count=42)
+        out = StringIO()
+        call_command('import_posts', path, model='comment', stdout=out)
+        self.assertIn('пропущено: 1', out.getvalue())
+        self.assertTrue(Comment.objects.filter(
+            post__isnull=True, text='Без поста').exists())
+        self.posts[1].refresh_from_db()
+        self.posts[2].refresh_from_db()
+        self.assertEqual(self.posts[1].comment_count, 1)
+        self.assertEqual(self.posts[2].comment_count, 42)
+        # Повторная загрузка выгрузки не создаёт дублей.
+        path = self.export('comment', 'ndjson')
+        count = Comment.objects.count()
+        call_command('import_posts', path, model='comment', stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), count)
+
+    def test_import_empty_text_and_bomb(self):
+        """Проверка: пустой текст CSV — пустая строка, бомба пропускается."""
+        path = os.path.join(self.dir.name, 'post.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            stream.write('text,author,image\n,author,\n,author,bomb.png\n')
+        with open(os.path.join(self.dir.name, 'bomb.png'), 'wb') as image:
+            image.write(b'png')
+        out, err = StringIO(), StringIO()
+        with mock.patch.object(bulk.uploads, 'store', side_effect=(
+                Image.DecompressionBombError('бомба'))):
+            call_command('import_posts', path, image_dir=self.dir.name,
+                         stdout=out, stderr=err)
+        self.assertIn('Загружено: 1, пропущено: 1', out.getvalue())
+        self.assertIn('bomb.png: бомба', err.getvalue())
+        self.assertTrue(Post.objects.filter(text='').exists())
+
+    def test_import_follow_graph(self):
+        """Проверка: граф подписок загружается из списка рёбер."""
+        path = os.path.join(self.dir.name, 'follows.txt')
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write('# user author\n'
+                         'reader author\n'
+                         'author reader\n'
+                         'author author\n'
+                         'ghost author\n')
+        out = StringIO()
+        call_command('import_follows', path, batch_size=2, stdout=out)
+        self.assertIn('Загружено: 2, пропущено: 2', out.getvalue())
+        self.assertEqual(Follow.objects.count(), 2)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).followers_count, 1)
+
+    def test_admin_export(self):
+        """Проверка: действие админки отдаёт выбранное потоком."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        selected = [post.pk for post in self.posts[:3]]
+        for fmt in ('csv', 'ndjson'):
+            with self.subTest(fmt=fmt):
+                response = self.client.post(
+                    reverse('admin:posts_post_changelist'),
+                    {'action': f'export_{fmt}',
+                     '_selected_action': selected})
+                self.assertTrue(response.streaming)
+                with CaptureQueriesContext(connection) as queries:
+                    lines = b''.join(
+                        response.streaming_content).decode().splitlines()
+                self.assertEqual(len(queries), 1)
+                rows = list(bulk.read_rows(lines, fmt))
+                self.assertEqual([int(row['id']) for row in rows], selected)
+                self.assertEqual(rows[0]['author'], 'author')
+                self.assertEqual(rows[0]['group'], 'test-slug')
+
+
+class FollowSuggestionsCommandTest(TestCase):
+    def test_build(self):
+        """Проверка: рекомендации строятся в нескольких процессах."""
+        reader, author, fan, other, similar = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'fan', 'other', 'similar'))
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=author, author=other)
+        Follow.objects.create(user=fan, author=author)
+        Follow.objects.create(user=fan, author=similar)
+        out = StringIO()
+        call_command('build_follow_suggestions', workers=2, stdout=out)
+        self.assertIn('пересчитаны: 3', out.getvalue())
+        stored = FollowSuggestions.objects.get(user=reader)
+        self.assertEqual(json.loads(stored.authors), [other.pk, similar.pk])
@@ -1,14 +1,23 @@
+import io
+import json
 import shutil
 import tempfile
+from datetime import timedelta
 from http import HTTPStatus
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.test import Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 
-from posts.models import Comment, Group, Post
+from core.testing import TestCase
+from posts import images, thumbnails
+from posts.models import Comment, Group, Post, ThumbnailJob
 
 User = get_user_model()
 
@@ -159,3 +168,182 @@ class PostFormTests(TestCase):
                                    author=self.user).exists())
         self.assertRedirects(response, reverse(
             'posts:post_detail', kwargs={'post_id': self.post.id}))
+
+    @override_settings(THUMBNAIL_INLINE=False)
+    def test_thumbnails_built_outside_request(self):
+        """Проверка: миниатюры строятся заданием, а не при показе страницы."""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=self.image,
+            content_type='image/gif',
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.PENDING)
+        self.assertFalse(post.thumbnails_ready)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        # Пока производных нет, выводится исходный файл.
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertNotContains(response, 'srcset=')
+
+        thumbnails.process(job.pk)
+        job.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        self.assertTrue(post.thumbnails_ready)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(response, 'srcset=')
+
+
+    @override_settings(THUMBNAIL_INLINE=False)
+    def test_stale_running_job_requeued(self):
+        """Проверка: задание упавшего исполнителя возвращается в очередь."""
+        uploaded = SimpleUploadedFile(
+            name='stale.gif', content=self.image, content_type='image/gif')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded})
+        job = ThumbnailJob.objects.get()
+        ThumbnailJob.objects.filter(pk=job.pk).update(
+            status=ThumbnailJob.RUNNING,
+            claimed=timezone.now() - timedelta(hours=1))
+        call_command('process_thumbnail_jobs', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        self.assertTrue(Post.objects.get(pk=job.post_id).thumbnails_ready)
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_WIDTHS=(320, 640, 960))
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, size, mode='RGB', fmt='JPEG', **save_options):
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'red').save(buffer, fmt, **save_options)
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(f'picture.{fmt.lower()}',
+                                        buffer.getvalue()),
+        })
+        return Post.objects.latest('pk')
+
+    def test_widths_and_formats(self):
+        """Проверка: производные не шире исходника и без метаданных."""
+        exif = Image.Exif()
+        exif[0x010e] = 'Описание'
+        post = self.upload((800, 400), exif=exif.tobytes())
+        variants = json.loads(post.image_variants)
+        self.assertEqual(variants['widths'], [320, 640, 800])
+        self.assertEqual(variants['formats'][-1], 'jpeg')
+        self.assertEqual((variants['width'], variants['height']), (800, 400))
+        for fmt in variants['formats']:
+            for width in variants['widths']:
+                name = images.variant_name(post.image.name, width, fmt)
+                with default_storage.open(name) as stream:
+                    variant = Image.open(stream)
+                    self.assertEqual(variant.size, (width, width // 2))
+                    self.assertNotIn('exif', variant.info)
+
+    def test_variant_names_unique(self):
+        """Проверка: у одноимённых картинок производные не совпадают."""
+        names = {images.variant_name(name, 320, 'webp')
+                 for name in ('posts/cat.jpg', 'posts/cat.png',
+                              'legacy/cat.jpg')}
+        self.assertEqual(len(names), 3)
+
+    def test_transparency_falls_back_to_png(self):
+        """Проверка: картинка с прозрачностью не теряет её в JPEG."""
+        post = self.upload((100, 100), mode='RGBA', fmt='PNG')
+        variants = json.loads(post.image_variants)
+        self.assertEqual(variants['widths'], [100])
+        self.assertEqual(variants['formats'][-1], 'png')
+
+    def test_srcset_markup(self):
+        """Проверка: страница выводит srcset и sizes."""
+        post = self.upload((1200, 600))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, 'sizes="(max-width: 800px) 100vw')
+        self.assertContains(response, images.srcset(
+            post.image.name, 'jpeg', [320, 640, 960]))
+        self.assertContains(response, 'width="960" height="480"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_INLINE=False)
+class UploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def upload(self, text, size=(300, 150), color='red'):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return self.authorized_client.post(reverse('posts:post_create'), {
+            'text': text,
+            'image': SimpleUploadedFile('picture.png', buffer.getvalue()),
+        })
+
+    def test_identical_uploads_stored_once(self):
+        """Проверка: одинаковые картинки — один файл и одно задание."""
+        self.upload('Первый')
+        self.upload('Второй')
+        self.upload('Другой', color='blue')
+        first, second, other = (Post.objects.get(text=text)
+                                for text in ('Первый', 'Второй', 'Другой'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertEqual(ThumbnailJob.objects.count(), 2)
+        job = ThumbnailJob.objects.get(image=first.image.name)
+        thumbnails.process(job.pk)
+        second.refresh_from_db()
+        self.assertTrue(second.thumbnails_ready)
+        self.upload('Третий')
+        self.assertTrue(Post.objects.get(text='Третий').thumbnails_ready)
+        self.assertEqual(ThumbnailJob.objects.count(), 2)
+
+    @override_settings(IMAGE_MAX_DIMENSION=100)
+    def test_large_original_downscaled(self):
+        """Проверка: оригинал уменьшается до IMAGE_MAX_DIMENSION."""
+        self.upload('Пост', color='green')
+        post = Post.objects.get(text='Пост')
+        with post.image.open() as stream:
+            self.assertEqual(Image.open(stream).size, (100, 50))
+
+    def test_limits(self):
+        """Проверка: слишком большие картинки и файлы не принимаются."""
+        cases = (
+            ({'IMAGE_MAX_PIXELS': 1000}, 'слишком большая'),
+            ({'IMAGE_MAX_UPLOAD_SIZE': 100}, 'Файл больше'),
+        )
+        for limits, message in cases:
+            with self.subTest(limits=limits), override_settings(**limits):
+                response = self.upload('Пост')
+                errors = response.context['form'].errors['image']
+                self.assertEqual(len(errors), 1)
+                self.assertIn(message, errors[0])
+                self.assertFalse(Post.objects.filter(text='Пост').exists())
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+
+from core.testing import TestCase
 
 from ..models import Group, Post
 
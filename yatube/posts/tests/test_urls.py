@@ -1,7 +1,9 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client
+
+from core.testing import TestCase
 
 from ..models import Group, Post
 
@@ -1,11 +1,21 @@
+import time
+from io import StringIO
+from unittest import mock
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.test import Client, override_settings
 from django.urls import reverse
-from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Follow, Group, Post
+from core.testing import TestCase
+from posts import comments, follows, search, suggestions
+from posts.models import (Comment, Follow, FollowSuggestions, Group, Post,
+                          TimelineEntry, TrendingGroup, TrendingPost,
+                          UserCounters)
 
 User = get_user_model()
 
@@ -119,6 +129,8 @@ class PaginatorViewsTest(TestCase):
             )
             cls.posts.append(post)
         Post.objects.bulk_create(cls.posts)
+        cls.follower = User.objects.create_user(username='test_follower')
+        Follow.objects.create(user=cls.follower, author=cls.user)
 
         cls.guest_client = Client()
 
@@ -126,26 +138,365 @@ class PaginatorViewsTest(TestCase):
             reverse('posts:index'),
             reverse('posts:profile', kwargs={'username': cls.user.username}),
             reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:follow_index'),
         ]
 
+    def setUp(self):
+        # Из кеша страница приходит без контекста.
+        cache.clear()
+        self.client.force_login(self.follower)
+
     def test_first_page_contains_ten_records(self):
+        """Проверка: количество постов на первой странице равно 10."""
         paginate_by = int(settings.PAGINATE_BY)
         for reverse_page in self.pages_uses_paginator:
             with self.subTest(reverse_page=reverse_page):
                 response = self.client.get(reverse_page)
-        """Проверка: количество постов на первой странице равно 10."""
                 self.assertEqual(len(
                     response.context['page_obj']), paginate_by)
 
     def test_second_page_contains_three_records(self):
+        """Проверка: на второй странице должно быть 5 постов."""
         paginate_by_five = self.amount_of_posts - int(settings.PAGINATE_BY)
         for reverse_page in self.pages_uses_paginator:
             with self.subTest(reverse_page=reverse_page):
                 response = self.client.get(reverse_page + '?page=2')
-        """Проверка: на второй странице должно быть 5 постов."""
                 self.assertEqual(
                     len(response.context['page_obj']), paginate_by_five,)
 
+    def test_cursor_pages(self):
+        """Проверка: курсоры ведут на следующую и предыдущую страницы."""
+        paginate_by = int(settings.PAGINATE_BY)
+        for reverse_page in self.pages_uses_paginator:
+            with self.subTest(reverse_page=reverse_page):
+                cache.clear()
+                first = self.client.get(reverse_page).context['page_obj']
+                self.assertTrue(first.has_next())
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    reverse_page,
+                    {'cursor': first.paginator.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second), self.amount_of_posts - paginate_by)
+                self.assertFalse(second.has_next())
+                self.assertTrue(second.has_previous())
+                self.assertFalse(
+                    set(first.object_list) & set(second.object_list))
+                back = self.client.get(
+                    reverse_page,
+                    {'cursor': second.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(back.object_list, first.object_list)
+                self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверка: испорченный курсор отдаёт первую страницу."""
+        response = self.client.get(reverse('posts:index'), {'cursor': '%%'})
+        self.assertEqual(
+            len(response.context['page_obj']), int(settings.PAGINATE_BY))
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов на страницу ленты не зависит от числа постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='test_author', first_name='Имя', last_name='Фамилия')
+        cls.follower = User.objects.create_user(username='test_follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test_slug'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text='Тестовый пост',
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.follower, text='Комментарий')
+        cls.authorized_follower = Client()
+        cls.authorized_follower.force_login(cls.follower)
+
+    def test_feed_query_count(self):
+        """Проверка: автор, группа и комментарии не дают N+1 запросов."""
+        # Первый запрос каждой страницы — версия для условного GET.
+        pages_queries = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 4,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}): 4,
+        }
+        for reverse_page, queries in pages_queries.items():
+            cache.clear()
+            with self.subTest(reverse_page=reverse_page):
+                with self.assertNumQueries(queries):
+                    self.client.get(reverse_page)
+        cache.clear()
+        # Лента подписок: разосланные записи и посты авторов без рассылки.
+        with self.assertNumQueries(4):
+            self.authorized_follower.get(reverse('posts:follow_index'))
+
+    def test_feed_comment_count(self):
+        """Проверка: в ленте у поста посчитаны комментарии."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0].comment_count, 1)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.follower = User.objects.create_user(username='test_follower')
+        cls.authorized_author = Client()
+        cls.authorized_author.force_login(cls.author)
+        cls.authorized_follower = Client()
+        cls.authorized_follower.force_login(cls.follower)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        self.authorized_author.post(
+            reverse('posts:post_create'), data={'text': 'Тестовый пост'})
+        post = Post.objects.get(text='Тестовый пост')
+        self.authorized_follower.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'})
+        self.authorized_follower.get(reverse('posts:profile_follow',
+                                     args={self.author.username}))
+        author = UserCounters.objects.get(user=self.author)
+        follower = UserCounters.objects.get(user=self.follower)
+        post.refresh_from_db()
+        self.assertEqual(author.posts_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(follower.following_count, 1)
+        self.assertEqual(post.comment_count, 1)
+
+        self.authorized_follower.get(reverse('posts:profile_unfollow',
+                                             args={self.author.username}))
+        response = self.client.get(
+            reverse('posts:profile', args={self.author.username}))
+        self.assertEqual(response.context['counters'].followers_count, 0)
+        self.assertEqual(response.context['counters'].posts_count, 1)
+
+    def test_drifted_counters_do_not_block_deletes(self):
+        """Разошедшийся счётчик не опускается ниже нуля при удалении."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.follower, text='Комментарий')
+        UserCounters.objects.filter(user=self.author).update(posts_count=0)
+        Post.objects.filter(pk=post.pk).update(comment_count=0)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        post.delete()
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 0)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты любят свежую рыбу')
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки гуляют в парке')
+
+    def find(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_uses_word_forms(self):
+        """Проверка: поиск находит посты по другим формам слова."""
+        self.assertEqual(self.find('котами'), [self.cats])
+        self.assertEqual(self.find('собака гуляла'), [self.dogs])
+        self.assertEqual(self.find('кошки'), [])
+        self.assertEqual(self.find(''), [])
+
+    def test_search_index_follows_changes(self):
+        """Проверка: индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.dogs.pk)
+        post.text = 'Собаки спят'
+        post.save()
+        self.assertEqual(self.find('гуляют'), [])
+        self.assertEqual(self.find('спящие собаки'), [])
+        self.assertEqual(self.find('собаки спят'), [post])
+        post.delete()
+        self.assertEqual(self.find('собаки'), [])
+
+    def test_search_ranked_and_paginated(self):
+        """Проверка: результаты листаются, а ссылки сохраняют запрос."""
+        paginate_by = int(settings.PAGINATE_BY)
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кот номер {i}')
+            for i in range(paginate_by)
+        )
+        search.rebuild()
+        self.assertEqual(len(self.find('кот')), paginate_by)
+        self.assertEqual(len(self.find('кот', page=2)), 1)
+        self.assertEqual(self.find('кот рыба'), [self.cats])
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82&amp;page=2')
+
+    def test_rebuild_without_index(self):
+        """Проверка: без FTS5 перестройка индекса не трогает базу."""
+        with mock.patch.object(search, 'available', return_value=False):
+            with self.assertNumQueries(0):
+                search.rebuild()
+
+    def test_search_without_index_logs_fallback(self):
+        """Проверка: без FTS5 поиск идёт через LIKE и пишет об этом."""
+        search._warn_without_index.cache_clear()
+        with mock.patch.object(search, 'available', return_value=False):
+            with self.assertLogs('posts.search', 'WARNING'):
+                self.assertEqual(self.find('Коты'), [self.cats])
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentThreadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+
+    def get_detail(self, **params):
+        """Страница поста и были ли при этом запросы к комментариям."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        read_comments = any('"posts_comment"' in query['sql']
+                            for query in queries.captured_queries)
+        return response, read_comments
+
+    def test_comments_paged_by_cursor(self):
+        """Проверка: комментарии выводятся страницами по курсору."""
+        response, _ = self.get_detail()
+        self.assertContains(response, 'Комментарий 1')
+        self.assertNotContains(response, 'Комментарий 2')
+        cursor = response.context['comments'].next_cursor
+        response, _ = self.get_detail(comments=cursor)
+        self.assertContains(response, 'Комментарий 2')
+        self.assertNotContains(response, 'Комментарий 0')
+        self.assertIsNone(response.context['comments'].next_cursor)
+
+    def test_thread_cached_and_appended(self):
+        """Проверка: ветка берётся из кеша, новый комментарий дописывается."""
+        response, _ = self.get_detail()
+        cursor = response.context['comments'].next_cursor
+        self.get_detail(comments=cursor)
+        _, read_comments = self.get_detail(comments=cursor)
+        self.assertFalse(read_comments)
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text='Новый комментарий')
+        comments.append(comment)
+        response, read_comments = self.get_detail(comments=cursor)
+        self.assertContains(response, 'Новый комментарий')
+        self.assertFalse(read_comments)
+
+    def test_lost_append_rebuilds_tail(self):
+        """Проверка: комментарий мимо кеша не теряется в хвосте ветки."""
+        response, _ = self.get_detail()
+        cursor = response.context['comments'].next_cursor
+        self.get_detail(comments=cursor)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Новый комментарий')
+        response, read_comments = self.get_detail(comments=cursor)
+        self.assertContains(response, 'Новый комментарий')
+        self.assertTrue(read_comments)
+
+    def test_delete_resets_thread(self):
+        """Проверка: удалённый комментарий пропадает из кеша."""
+        self.get_detail()
+        Comment.objects.filter(text='Комментарий 0').get().delete()
+        response, _ = self.get_detail()
+        self.assertNotContains(response, 'Комментарий 0')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_slug')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        text='Тестовый пост')
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.author)
+        self.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def etags(self, client=None):
+        client = client or self.client
+        return [client.get(page)['ETag'] for page in self.pages]
+
+    def test_not_modified(self):
+        """Проверка: неизменившаяся страница отдаётся 304 без SQL."""
+        for page, etag in zip(self.pages, self.etags()):
+            with self.subTest(page=page):
+                # Анониму 304 отвечает кеш страниц, не обращаясь к базе.
+                with self.assertNumQueries(0):
+                    response = self.client.get(page, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_content(self):
+        """Проверка: правка, комментарий и удаление меняют версию."""
+        etags = self.etags()
+        self.authorized_author.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Изменённый пост', 'group': self.group.pk})
+        edited = self.etags()
+        self.assertTrue(all(map(str.__ne__, etags, edited)))
+        self.authorized_author.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        commented = self.etags()
+        self.assertNotEqual(commented[-1], edited[-1])
+        Post.objects.create(author=self.author, text='Второй пост').delete()
+        self.assertNotEqual(self.etags()[0], commented[0])
+
+    def test_etag_changes_with_author_and_trending(self):
+        """Проверка: имя автора и популярные группы входят в версию."""
+        other = Group.objects.create(title='Другая группа', slug='other')
+        etags = self.etags()
+        self.author.first_name = 'Лев'
+        self.author.save()
+        renamed = self.etags()
+        self.assertTrue(all(map(str.__ne__, etags, renamed)))
+        Post.objects.create(author=self.author, group=other, text='Пост')
+        self.assertNotEqual(self.etags()[1], renamed[1])
+
+    def test_etag_depends_on_user(self):
+        """Проверка: вошедший пользователь не получит страницу анонима."""
+        anonymous = self.client.get(self.pages[0])
+        response = self.authorized_author.get(
+            self.pages[0], HTTP_IF_NONE_MATCH=anonymous['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertTrue(anonymous.has_header('Last-Modified'))
+
 
 class CacheTest(TestCase):
     @classmethod
@@ -163,18 +514,126 @@ class CacheTest(TestCase):
         """Проверка кеширования гл.стр."""
         cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
-        content_len_before = len(response.content)
+        content_before = response.content
 
-        self.post.delete()
+        # update() не посылает сигналов, поэтому фрагмент остаётся в кеше.
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
 
         response = self.guest_client.get(reverse('posts:index'))
-        content_len_after = len(response.content)
-        self.assertEqual(content_len_before, content_len_after)
+        self.assertEqual(response.content, content_before)
 
         cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
-        content_len_after = len(response.content)
-        self.assertNotEqual(content_len_after, content_len_before)
+        self.assertContains(response, 'Новый текст')
+
+    def test_cache_invalidated_on_change(self):
+        """Проверка: изменение поста сразу видно на гл.стр."""
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый текст')
+
+        post.delete()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый текст')
+
+    def test_cache_keyed_by_page(self):
+        """Проверка: каждая страница кешируется отдельно."""
+        cache.clear()
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(int(settings.PAGINATE_BY))
+        )
+        first = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(first, self.post.text)
+        second = self.guest_client.get(
+            reverse('posts:index'),
+            {'cursor': first.context['page_obj'].paginator.next_cursor}
+        )
+        self.assertContains(second, self.post.text)
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_author = Client()
+        self.authorized_author.force_login(self.author)
+        self.authorized_reader = Client()
+        self.authorized_reader.force_login(self.reader)
+
+    def test_anonymous_page_cached(self):
+        """Проверка: аноним получает страницу из кеша без SQL."""
+        first = self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('posts:index'))
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_holes_filled_per_user(self):
+        """Проверка: оболочка страницы общая, фрагменты свои у каждого."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        pages = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                self.client.get(page)
+                author = self.authorized_author.get(page)
+                reader = self.authorized_reader.get(page)
+                self.assertContains(author, 'Пользователь: test_author')
+                self.assertContains(reader, 'Пользователь: test_reader')
+                self.assertNotContains(reader, 'Пользователь: test_author')
+        profile, detail = pages
+        self.assertContains(self.authorized_reader.get(profile), 'Отписаться')
+        self.assertContains(self.client.get(profile), 'Подписаться')
+        self.assertContains(self.authorized_author.get(detail),
+                            'редактировать запись')
+        response = self.authorized_reader.get(detail)
+        self.assertNotContains(response, 'редактировать запись')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(self.client.get(detail), 'csrfmiddlewaretoken')
+
+    def test_invalidated_by_signals(self):
+        """Проверка: изменения моделей сбрасывают кеш страниц."""
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.client.get(profile)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertContains(self.client.get(profile), 'Новый пост')
+        self.authorized_reader.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertContains(self.client.get(profile), 'Подписчиков: 1')
+
+    def test_invalidation_scoped(self):
+        """Проверка: комментарий сбрасывает только страницы своего поста."""
+        other = Post.objects.create(author=self.reader, text='Другой пост')
+        unrelated = (
+            reverse('posts:post_detail', args=[other.pk]),
+            reverse('posts:profile', args=[self.reader.username]),
+        )
+        detail = reverse('posts:post_detail', args=[self.post.pk])
+        for page in (*unrelated, detail):
+            self.client.get(page)
+        self.authorized_reader.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Новый комментарий'})
+        for page in unrelated:
+            with self.subTest(page=page):
+                with self.assertNumQueries(0):
+                    self.client.get(page)
+        self.assertContains(self.client.get(detail), 'Новый комментарий')
 
 
 class FollowTest(TestCase):
@@ -224,3 +683,266 @@ class FollowTest(TestCase):
         response = authorized_user.get(reverse('posts:follow_index'))
         posts = response.context['posts']
         self.assertNotIn(post, posts)
+
+    def test_post_fanned_out_to_follower(self):
+        """Новый пост раскладывается в ленту подписчика."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дополняет ленту, отписка очищает её."""
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        self.authorized_follower.get(reverse('posts:profile_follow',
+                                     args={self.author.username}))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        self.authorized_follower.get(reverse('posts:profile_unfollow',
+                                             args={self.author.username}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.follower).exists())
+        response = self.authorized_follower.get(reverse('posts:follow_index'))
+        self.assertNotIn(post, response.context['posts'])
+
+    def test_follow_button_state(self):
+        """Кнопка на профиле отражает подписку именно этого user."""
+        cache.clear()
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        profile = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.authorized_follower.get(profile),
+                            'Подписаться')
+        self.authorized_follower.get(reverse('posts:profile_follow',
+                                     args={self.author.username}))
+        self.assertContains(self.authorized_follower.get(profile),
+                            'Отписаться')
+        self.authorized_follower.get(reverse('posts:profile_unfollow',
+                                             args={self.author.username}))
+        self.assertContains(self.authorized_follower.get(profile),
+                            'Подписаться')
+
+    def test_feed_follow_buttons_without_queries_per_post(self):
+        """Подписки для кнопок в ленте читаются один раз за запрос."""
+        cache.clear()
+        authors = [User.objects.create_user(username=f'author{i}')
+                   for i in range(3)]
+        for author in authors:
+            Post.objects.create(text='Тестовый текст', author=author)
+        Follow.objects.create(user=self.follower, author=authors[0])
+        self.authorized_follower.get(reverse('posts:index'))
+        follows.invalidate(self.follower.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_follower.get(reverse('posts:index'))
+        follow_queries = [query for query in queries.captured_queries
+                          if 'posts_follow' in query['sql']]
+        self.assertEqual(len(follow_queries), 1)
+        self.assertContains(response, 'Отписаться', count=1)
+        self.assertContains(response, 'Подписаться', count=2)
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_follower.get(reverse('posts:index'))
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_follow' in query['sql']])
+
+    def test_follow_many(self):
+        """Подписка на список авторов не зависит от его длины по запросам."""
+        authors = [User.objects.create_user(username=f'author{i}')
+                   for i in range(20)]
+        post = Post.objects.create(text='Тестовый текст', author=authors[0])
+        Follow.objects.create(user=self.follower, author=authors[1])
+        usernames = [author.username for author in authors]
+        usernames += [self.follower.username, 'unknown']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_follower.post(
+                reverse('posts:follow_many'), {'username': usernames})
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        self.assertLess(len(queries), 20)
+        self.assertEqual(Follow.objects.filter(user=self.follower).count(),
+                         20)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.follower, post=post).exists())
+        counters = UserCounters.objects.get(user=self.follower)
+        self.assertEqual(counters.following_count, 20)
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_follower.post(
+                reverse('posts:unfollow_many'),
+                {'username': usernames[:10]})
+        self.assertLess(len(queries), 20)
+        self.assertEqual(Follow.objects.filter(user=self.follower).count(),
+                         10)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.follower).exists())
+        counters.refresh_from_db()
+        self.assertEqual(counters.following_count, 10)
+        profile = reverse('posts:profile', args=[authors[0].username])
+        self.assertContains(self.authorized_follower.get(profile),
+                            'Подписаться')
+
+    @override_settings(FOLLOW_BULK_LIMIT=2)
+    def test_follow_many_limit(self):
+        """Слишком длинный список и GET отклоняются."""
+        response = self.authorized_follower.post(
+            reverse('posts:follow_many'), {'username': ['a', 'b', 'c']})
+        self.assertEqual(response.status_code, 400)
+        response = self.authorized_follower.get(reverse('posts:follow_many'))
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_read_on_request(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Тестовый текст', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorized_follower.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['posts'])
+
+    @override_settings(PAGINATE_BY=2)
+    def test_timeline_merges_sources(self):
+        """Проверка: разосланные и подмешанные посты листаются по дате."""
+        popular = User.objects.create_user(username='popular')
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.follower, author=popular)
+        posts = []
+        for i in range(5):
+            posts.append(Post.objects.create(text=f'Пост {i}',
+                                             author=self.author))
+            with override_settings(FOLLOW_TIMELINE_FANOUT_LIMIT=0):
+                posts.append(Post.objects.create(text=f'Популярный {i}',
+                                                 author=popular))
+        seen, cursor = [], None
+        while True:
+            response = self.authorized_follower.get(
+                reverse('posts:follow_index'), {'cursor': cursor or ''})
+            page_obj = response.context['page_obj']
+            seen.extend(page_obj)
+            cursor = page_obj.paginator.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(seen, posts[::-1])
+        response = self.authorized_follower.get(
+            reverse('posts:follow_index'),
+            {'cursor': page_obj.paginator.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']), posts[3:1:-1])
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.author, cls.fan, cls.other, cls.similar = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'fan', 'other', 'similar'))
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.other)
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        Follow.objects.create(user=cls.fan, author=cls.similar)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_reader = Client()
+        self.authorized_reader.force_login(self.reader)
+
+    def test_scores(self):
+        """Друзья друзей выше авторов, похожих по подписчикам."""
+        self.assertEqual(suggestions.build(workers=1), 3)
+        response = self.authorized_reader.get(reverse('posts:suggestions'))
+        self.assertEqual(response.context['authors'],
+                         [self.other, self.similar])
+        self.assertContains(response, reverse('posts:follow_many'))
+
+    def test_followed_and_stale_skipped(self):
+        """Уже прочитанные авторы не предлагаются до пересчёта."""
+        suggestions.build(workers=1)
+        Follow.objects.create(user=self.reader, author=self.other)
+        response = self.authorized_reader.get(reverse('posts:suggestions'))
+        self.assertEqual(response.context['authors'], [self.similar])
+        Follow.objects.filter(user=self.fan).delete()
+        suggestions.build(workers=1)
+        self.assertFalse(FollowSuggestions.objects.filter(
+            user=self.fan).exists())
+
+    def test_popular_without_suggestions(self):
+        """Без готового списка предлагаются самые читаемые авторы."""
+        newcomer = User.objects.create_user(username='newcomer')
+        client = Client()
+        client.force_login(newcomer)
+        response = client.get(reverse('posts:suggestions'))
+        self.assertEqual(response.context['authors'][0], self.author)
+        self.assertNotIn(newcomer, response.context['authors'])
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='test_author')
+        cls.reader = User.objects.create_user(username='test_reader')
+        cls.quiet = Group.objects.create(title='Тихая', slug='quiet')
+        cls.busy = Group.objects.create(title='Шумная', slug='busy')
+        cls.old = Post.objects.create(author=cls.author, group=cls.quiet,
+                                      text='Старый пост')
+        cls.hot = Post.objects.create(author=cls.author, group=cls.busy,
+                                      text='Обсуждаемый пост')
+        for _ in range(2):
+            Comment.objects.create(post=cls.hot, author=cls.reader,
+                                   text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+
+    def current(self, rank):
+        return 2 ** (rank - time.time() / settings.TRENDING_HALF_LIFE)
+
+    def test_scores_updated_incrementally(self):
+        """Пост и комментарии складываются в затухающую оценку."""
+        weights = settings.TRENDING_WEIGHTS
+        hot = TrendingPost.objects.get(post=self.hot)
+        self.assertAlmostEqual(self.current(hot.rank),
+                               weights['post'] + 2 * weights['comment'],
+                               places=3)
+        old = TrendingPost.objects.get(post=self.old)
+        self.assertAlmostEqual(self.current(old.rank), weights['post'],
+                               places=3)
+        self.assertGreater(
+            TrendingGroup.objects.get(group=self.busy).rank,
+            TrendingGroup.objects.get(group=self.quiet).rank)
+
+    def test_trending_page(self):
+        """Лента «Популярное» читает оценки, а не комментарии."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.hot, self.old])
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'posts_comment' in query['sql']])
+        response = self.client.get(
+            reverse('posts:group_list', args=[self.quiet.slug]))
+        self.assertEqual(response.context['trending_groups'],
+                         [self.busy, self.quiet])
+
+    def test_follow_counts_for_latest_post(self):
+        """Подписка поднимает последний пост автора."""
+        before = TrendingPost.objects.get(post=self.hot).rank
+        client = Client()
+        client.force_login(self.reader)
+        client.post(reverse('posts:follow_many'),
+                    {'username': [self.author.username]})
+        client.post(reverse('posts:follow_many'),
+                    {'username': [self.author.username]})
+        after = TrendingPost.objects.get(post=self.hot).rank
+        self.assertAlmostEqual(self.current(after) - self.current(before),
+                               settings.TRENDING_WEIGHTS['follow'],
+                               places=3)
+
+    def test_refresh(self):
+        """Затухшие оценки удаляются, --rebuild считает их заново."""
+        TrendingPost.objects.filter(post=self.old).update(rank=0)
+        call_command('refresh_trending', stdout=StringIO())
+        self.assertFalse(TrendingPost.objects.filter(post=self.old).exists())
+        call_command('refresh_trending', rebuild=True, stdout=StringIO())
+        self.assertEqual(TrendingPost.objects.count(), 2)
+        weights = settings.TRENDING_WEIGHTS
+        hot = TrendingPost.objects.get(post=self.hot).rank
+        self.assertAlmostEqual(self.current(hot),
+                               weights['post'] + 2 * weights['comment'],
+                               places=3)
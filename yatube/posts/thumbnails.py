@@ -0,0 +1,140 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import images, pages
+from .caching import bump_feed_generation
+from .models import Post, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def schedule(post):
+    """
+    Ставит в очередь построение миниатюр для картинки поста.
+    Задание сохраняется в ThumbnailJob и переживает перезапуск процесса,
+    а в фоновый поток передаётся только после фиксации транзакции. Без
+    THUMBNAIL_WORKERS его выполнит process_thumbnail_jobs --watch.
+
+    Одинаковые загрузки хранятся одним файлом (см. uploads.store): если
+    для этой картинки производные уже есть, они переиспользуются, а если
+    задание на неё уже в очереди, оно отметит и этот пост.
+    """
+    built = Post.objects.filter(
+        image=post.image.name, thumbnails_ready=True
+    ).exclude(pk=post.pk).exclude(image_variants='').values_list(
+        'image_variants', flat=True).first()
+    post.thumbnails_ready = built is not None
+    post.image_variants = built or ''
+    Post.objects.filter(pk=post.pk).update(
+        thumbnails_ready=post.thumbnails_ready,
+        image_variants=post.image_variants, modified=timezone.now())
+    if built is not None:
+        return
+    job = ThumbnailJob.objects.filter(
+        image=post.image.name,
+        status__in=(ThumbnailJob.PENDING, ThumbnailJob.RUNNING)).first()
+    if job is None:
+        job = ThumbnailJob.objects.create(post=post, image=post.image.name)
+    elif not requeue_stale(pk=job.pk):
+        return
+    dispatch(job.pk)
+
+
+def dispatch(job_id):
+    if settings.THUMBNAIL_INLINE:
+        process(job_id)
+    elif settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(run, job_id))
+
+
+def requeue_stale(**filters):
+    """
+    Возвращает в очередь задания, взятые в работу дольше
+    THUMBNAIL_JOB_TIMEOUT назад: их исполнитель, видимо, упал.
+    Возвращает число таких заданий.
+    """
+    deadline = timezone.now() - timedelta(
+        seconds=settings.THUMBNAIL_JOB_TIMEOUT)
+    return ThumbnailJob.objects.filter(
+        Q(claimed__lt=deadline) | Q(claimed__isnull=True),
+        status=ThumbnailJob.RUNNING, **filters,
+    ).update(status=ThumbnailJob.PENDING, claimed=None)
+
+
+def urls(post):
+    """
+    Адреса готовых производных картинки: формат -> ширина -> адрес.
+    None, пока они не построены; адреса выводятся из имени картинки
+    без обращения к хранилищу.
+    """
+    variants = images.variants(post)
+    if variants is None:
+        return None
+    return {
+        fmt: {width: images.url(post.image.name, width, fmt)
+              for width in variants['widths']}
+        for fmt in variants['formats']
+    }
+
+
+def run(job_id):
+    """Точка входа фонового потока."""
+    try:
+        process(job_id)
+    finally:
+        close_old_connections()
+
+
+def process(job_id):
+    """Строит миниатюры; задание выполняется только одним исполнителем."""
+    claimed = ThumbnailJob.objects.filter(
+        pk=job_id, status=ThumbnailJob.PENDING
+    ).update(status=ThumbnailJob.RUNNING, claimed=timezone.now())
+    if not claimed:
+        return
+    job = ThumbnailJob.objects.get(pk=job_id)
+    post = Post.objects.filter(image=job.image).only('image').first()
+    if post is None:
+        # Картинку уже заменили, для новой поставлено своё задание.
+        job.status = ThumbnailJob.DONE
+        job.save(update_fields=('status',))
+        return
+    try:
+        variants = images.build(post.image)
+    except Exception as error:
+        logger.exception('Не удалось построить миниатюры для %s', job.image)
+        job.status = ThumbnailJob.FAILED
+        job.error = str(error)
+        job.save(update_fields=('status', 'error'))
+        return
+    job.status = ThumbnailJob.DONE
+    job.save(update_fields=('status',))
+    # Отмечаются все посты с этой картинкой, кроме тех, где её успели
+    # заменить, пока строились миниатюры.
+    posts = Post.objects.filter(image=job.image)
+    if posts.update(thumbnails_ready=True, image_variants=variants,
+                    modified=timezone.now()):
+        bump_feed_generation()
+        for post in posts.select_related('author', 'group'):
+            pages.post_changed(post)
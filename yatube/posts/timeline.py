@@ -0,0 +1,129 @@
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import FEED_FIELDS, Follow, Post, TimelineEntry
+from .paginators import PREVIOUS, KeysetPaginator, keyset_page
+
+BATCH_SIZE = 500
+
+
+def fan_out(post):
+    """
+    Раскладывает новый пост по лентам подписчиков автора.
+    Посты авторов, у которых подписчиков больше FOLLOW_TIMELINE_FANOUT_LIMIT,
+    не рассылаются: они попадают в ленту при чтении (fan-out-on-read).
+    """
+    limit = settings.FOLLOW_TIMELINE_FANOUT_LIMIT
+    followers = Follow.objects.filter(author_id=post.author_id)
+    if followers[:limit + 1].count() > limit:
+        return
+    # Отмечаем пост до чтения подписчиков: тот, кто подпишется в этот
+    # момент, получит пост через backfill.
+    Post.objects.filter(pk=post.pk).update(fanned_out=True)
+    post.fanned_out = True
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.values_list('user_id', flat=True)),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту нового подписчика разосланные посты автора."""
+    posts = Post.objects.filter(
+        author_id=follow.author_id, fanned_out=True
+    ).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=follow.user_id, post_id=post_id,
+                       author_id=follow.author_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_many(pairs):
+    """
+    То же, что backfill, для пачки подписок (user_id, author_id),
+    созданных bulk_create без сигналов.
+    """
+    followers = {}
+    for user_id, author_id in pairs:
+        followers.setdefault(author_id, []).append(user_id)
+    posts = Post.objects.filter(
+        author_id__in=list(followers), fanned_out=True
+    ).values_list('pk', 'author_id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                       pub_date=pub_date)
+         for post_id, author_id, pub_date in posts.iterator()
+         for user_id in followers[author_id]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(follow):
+    """Убирает из ленты посты автора, от которого пользователь отписался."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def prune_many(user_id, author_ids):
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids
+    ).delete()
+
+
+def timeline_posts(user):
+    """
+    Лента подписок одним запросом: разосланные пользователю посты плюс
+    нерассылавшиеся посты авторов, на которых он подписан. Нужна
+    обычному Paginator для ссылок ?page=N; по курсору лента читается
+    TimelinePaginator.
+    """
+    inbox = TimelineEntry.objects.filter(user=user).values('post_id')
+    followed = Follow.objects.filter(user=user).values('author_id')
+    return Post.objects.feed().filter(
+        Q(pk__in=inbox) | Q(fanned_out=False, author__in=followed)
+    )
+
+
+class TimelinePaginator(KeysetPaginator):
+    """
+    Лента подписок по курсору (pub_date, id). Страница собирается из
+    двух диапазонных запросов: записей TimelineEntry пользователя вместе
+    с постами по индексу (user, pub_date, post) и нерассылавшихся постов
+    авторов, на которых он подписан (fan-out-on-read), по частичному
+    индексу post_pull_idx. Обе выборки сливаются по ключу.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(Post.objects.feed(), per_page)
+        self.user = user
+
+    def sources(self, position):
+        """Запросы страницы из обоих источников."""
+        limit = self.per_page + 1
+        inbox = TimelineEntry.objects.filter(user=self.user).select_related(
+            'post__author', 'post__group').only(
+            'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS))
+        pulled = self.object_list.filter(
+            fanned_out=False,
+            author__in=Follow.objects.filter(
+                user=self.user).values('author_id'),
+        )
+        return (keyset_page(inbox, position, limit, pk='post_id'),
+                keyset_page(pulled, position, limit))
+
+    def page_queryset(self, position):
+        inbox, pulled = self.sources(position)
+        posts = chain((entry.post for entry in inbox), pulled)
+        backwards = position is not None and position[0] == PREVIOUS
+        return sorted(posts, key=lambda post: (post.pub_date, post.pk),
+                      reverse=not backwards)[:self.per_page + 1]
@@ -0,0 +1,148 @@
+"""
+Популярное: посты и группы по затухающей оценке недавних событий.
+
+Событие (новый пост, комментарий, подписка на автора) весом w в момент
+t добавляет к оценке w·2^((t − now)/TRENDING_HALF_LIFE): за каждый
+период полураспада вклад вдвое меньше. Хранится не сама оценка, а
+rank = log2(Σ w·2^(t/TRENDING_HALF_LIFE)). Со временем все оценки
+затухают одинаково, поэтому порядок по rank от момента не зависит:
+строки не нужно пересчитывать, а ленту можно читать по индексу rank.
+Новое событие прибавляется к rank одним UPDATE через log2(2^a + 2^b).
+
+Оценки меняются сигналами (см. posts.signals) и follows.follow_many, а
+manage.py refresh_trending удаляет затухшие строки и при --rebuild
+пересчитывает таблицы по постам и комментариям.
+"""
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Abs, Greatest, Log, Power
+
+from . import pages
+from .conditional import mark_trending_changed
+from .models import Comment, Group, Post, TrendingGroup, TrendingPost
+
+
+def _now_rank():
+    return time.time() / settings.TRENDING_HALF_LIFE
+
+
+def _add(model, key, weights):
+    """
+    Прибавляет события к оценкам: weights — {id: вес}. Строки с
+    одинаковым весом обновляются одним запросом.
+    """
+    by_weight = defaultdict(list)
+    for pk, weight in weights.items():
+        if pk is not None:
+            by_weight[weight].append(pk)
+    now = _now_rank()
+    for weight, ids in by_weight.items():
+        rank = math.log2(weight) + now
+        rows = model.objects.filter(**{f'{key}__in': ids})
+        existing = set(rows.values_list(key, flat=True))
+        rows.update(
+            rank=Greatest(F('rank'), rank) + Log(
+                2, 1 + Power(2, -Abs(F('rank') - rank))))
+        model.objects.bulk_create(
+            (model(**{key: pk, 'rank': rank})
+             for pk in ids if pk not in existing),
+            ignore_conflicts=True,
+        )
+
+
+def _changed(groups=True):
+    """
+    Сбрасывает страницу «Популярного», а если изменились оценки групп —
+    и их блок на страницах групп.
+    """
+    if groups:
+        mark_trending_changed()
+    pages.trending_changed(groups)
+
+
+def record(events, kind):
+    """События одного вида: [(id поста, id группы), ...]."""
+    weight = settings.TRENDING_WEIGHTS[kind]
+    posts, groups = defaultdict(int), defaultdict(int)
+    for post_id, group_id in events:
+        posts[post_id] += weight
+        groups[group_id] += weight
+    _add(TrendingPost, 'post_id', posts)
+    _add(TrendingGroup, 'group_id', groups)
+    _changed(any(group_id is not None for group_id in groups))
+
+
+def record_follows(author_ids):
+    """Подписка засчитывается последнему посту автора и его группе."""
+    latest = Post.objects.filter(author_id=OuterRef('author_id')).order_by(
+        '-pub_date', '-pk').values('pk')[:1]
+    events = Post.objects.filter(
+        author_id__in=author_ids, pk=Subquery(latest)
+    ).values_list('pk', 'group_id')
+    record(list(events), 'follow')
+
+
+def posts():
+    """Посты для ленты «Популярное» по убыванию оценки."""
+    return Post.objects.feed().filter(
+        trending__isnull=False).order_by('-trending__rank', '-pk')
+
+
+def groups(limit=None):
+    return list(Group.objects.filter(trending__isnull=False).order_by(
+        '-trending__rank')[:limit or settings.TRENDING_GROUPS])
+
+
+def prune():
+    """Удаляет оценки, затухшие ниже TRENDING_MIN_SCORE."""
+    threshold = _now_rank() + math.log2(settings.TRENDING_MIN_SCORE)
+    deleted = 0
+    for model in (TrendingPost, TrendingGroup):
+        deleted += model.objects.filter(rank__lt=threshold).delete()[0]
+    if deleted:
+        _changed()
+    return deleted
+
+
+def _log_sum(ranks):
+    top = max(ranks)
+    return top + math.log2(sum(2 ** (rank - top) for rank in ranks))
+
+
+def rebuild(since):
+    """
+    Заново считает оценки по постам и комментариям после since. У
+    подписок нет даты, поэтому их вклад при пересчёте теряется.
+    """
+    ranks = {TrendingPost: defaultdict(list), TrendingGroup: defaultdict(list)}
+    half_life = settings.TRENDING_HALF_LIFE
+    sources = (
+        ('post', Post.objects.filter(pub_date__gte=since).values_list(
+            'pk', 'group_id', 'pub_date')),
+        ('comment', Comment.objects.filter(
+            created__gte=since, post__isnull=False).values_list(
+            'post_id', 'post__group_id', 'created')),
+    )
+    for kind, rows in sources:
+        weight = math.log2(settings.TRENDING_WEIGHTS[kind])
+        for post_id, group_id, moment in rows.iterator():
+            rank = weight + moment.timestamp() / half_life
+            ranks[TrendingPost][post_id].append(rank)
+            if group_id is not None:
+                ranks[TrendingGroup][group_id].append(rank)
+    with transaction.atomic():
+        for model, key in ((TrendingPost, 'post_id'),
+                           (TrendingGroup, 'group_id')):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                (model(**{key: pk, 'rank': _log_sum(values)})
+                 for pk, values in ranks[model].items()),
+                batch_size=1000,
+            )
+    _changed()
+    return sum(len(values) for values in ranks.values())
@@ -0,0 +1,144 @@
+"""
+Приём картинок постов.
+
+Загрузка пишется прямо во временный файл (в памяти держится только
+начало файла, пока по нему не прочитан заголовок) и по дороге хешируется.
+Размеры картинки известны по заголовку задолго до конца загрузки: слишком
+большой файл или «бомба» с огромным числом пикселей дальше не пишутся.
+
+Сохраняется картинка под именем из SHA-256 содержимого, поэтому
+одинаковые загрузки лежат в хранилище одним файлом и производные для
+него строятся один раз (см. thumbnails.schedule). Оригиналы больше
+IMAGE_MAX_DIMENSION уменьшаются до сохранения.
+"""
+import hashlib
+import io
+import warnings
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Сколько байт начала файла держать в памяти в поисках заголовка.
+HEADER_BYTES = 256 * 1024
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+def header_size(head):
+    """
+    Размеры картинки по началу файла или None, если заголовок ещё не
+    дочитан. Пиксели при этом не декодируются.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+        try:
+            return Image.open(io.BytesIO(head)).size
+        except Image.DecompressionBombError:
+            return (settings.IMAGE_MAX_PIXELS + 1, 1)
+        except Exception:
+            return None
+
+
+def size_error(width, height):
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        return (f'Картинка {width}×{height} слишком большая: можно не '
+                f'больше {settings.IMAGE_MAX_PIXELS} пикселей.')
+    return None
+
+
+class StreamingImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загрузку во временный файл и считает её SHA-256. Если файл
+    больше IMAGE_MAX_UPLOAD_SIZE или картинка по заголовку больше
+    IMAGE_MAX_PIXELS, остаток не пишется, а причина остаётся в
+    upload_error файла: её покажет PostForm.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.head = b''
+        self.sniffing = True
+        self.received = 0
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_MAX_UPLOAD_SIZE:
+            limit = filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)
+            self.error = f'Файл больше {limit}.'
+            return None
+        if self.sniffing:
+            self.head += raw_data
+            size = header_size(self.head)
+            if size is not None or len(self.head) >= HEADER_BYTES:
+                # Без заголовка файл проверит сама форма.
+                self.sniffing = False
+                self.head = b''
+            if size is not None:
+                self.error = size_error(*size)
+                if self.error:
+                    return None
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = None if self.error else self.sha256.hexdigest()
+        file.upload_error = self.error
+        return file
+
+
+def content_hash(upload):
+    digest = getattr(upload, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    upload.seek(0)
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _downscaled(image):
+    """Уменьшенная копия без метаданных; EXIF-поворот применяется."""
+    fmt = image.format
+    limit = settings.IMAGE_MAX_DIMENSION
+    image.draft(image.mode, (limit, limit))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    image.info = {}
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **SAVE_OPTIONS.get(fmt, {}))
+    return ContentFile(buffer.getvalue())
+
+
+def store(upload):
+    """
+    Сохраняет загруженную картинку и возвращает её имя в хранилище.
+    Если такая картинка уже есть, файл не пишется повторно.
+    """
+    digest = content_hash(upload)
+    upload.seek(0)
+    image = Image.open(upload)
+    fmt = image.format
+    name = f'posts/{digest}.{EXTENSIONS.get(fmt, fmt.lower())}'
+    if default_storage.exists(name):
+        return name
+    limit = settings.IMAGE_MAX_DIMENSION
+    if max(image.size) > limit and not getattr(image, 'is_animated', False):
+        content = _downscaled(image)
+    else:
+        upload.seek(0)
+        content = upload
+    return default_storage.save(name, content)
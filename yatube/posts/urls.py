@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -8,6 +8,8 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('trending/', views.trending_posts, name='trending'),
+    path('search/', views.search, name='search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
@@ -19,4 +21,17 @@ urlpatterns = [
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'),
+    path('follow/suggestions/', views.follow_suggestions,
+         name='suggestions'),
+    path('follow/bulk/', views.follow_many, name='follow_many'),
+    path('unfollow/bulk/', views.unfollow_many, name='unfollow_many'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/v1/profile/<str:username>/', api.profile,
+         name='api_profile'),
+    path('api/v1/follow/', api.follow_index, name='api_follow'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/v1/posts/<int:post_id>/comments/', api.post_comments,
+         name='api_comments'),
 ]
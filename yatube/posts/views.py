@@ -2,94 +2,160 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import QuerySet
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
 
+from core import page_cache
+from core.db.sqlite import single_writer
+
+from . import (comments, conditional, follows, pages, suggestions,
+               thumbnails, trending)
+from .caching import feed_cache_context
+from .counters import get_counters
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .paginators import KeysetPaginator
+from .search import search_posts
+from .timeline import TimelinePaginator, timeline_posts
 
 
-def pages_pagination(request, s):
+def pages_pagination(request, s, paginator=None):
+    """
+    Постраничный вывод по курсору (pub_date, id).
+    Старые ссылки вида ?page=N и ранжированные результаты поиска
+    обслуживаются обычным Paginator. paginator — курсорный пагинатор
+    ленты, если KeysetPaginator по s для неё не годится.
+    """
     paginate_by = int(settings.PAGINATE_BY)
-    paginator = Paginator(s, paginate_by)
     page_num = request.GET.get('page')
-    page_obj = paginator.get_page(page_num)
-    return page_obj
+    if page_num is not None or not isinstance(s, QuerySet):
+        return Paginator(s, paginate_by).get_page(page_num)
+    paginator = paginator or KeysetPaginator(s, paginate_by)
+    return paginator.get_page(request.GET.get('cursor'))
 
 
+@conditional.conditional_page(conditional.all_posts)
+@page_cache.cached_page(pages.index)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.feed()
     page_obj = pages_pagination(request, post_list)
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        **feed_cache_context(),
     }
     return render(request, template, context)
 
 
+@conditional.conditional_page(conditional.group_posts)
+@page_cache.cached_page(pages.group_posts)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = Post.objects.feed().filter(group=group)
     page_obj = pages_pagination(request, posts)
     template = 'posts/group_list.html'
     context = {
         'posts': posts,
         'group': group,
         'page_obj': page_obj,
+        'trending_groups': trending.groups(),
+        **feed_cache_context(),
     }
     return render(request, template, context)
 
 
+@conditional.conditional_page(conditional.author_posts)
+@page_cache.cached_page(pages.profile)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    total_author_posts = author.posts.all()
+    total_author_posts = Post.objects.feed().filter(author=author)
     page_obj = pages_pagination(request, total_author_posts)
-    user = request.user
-    following = user.is_authenticated and author.following.exists()
     context = {
         'author': author,
+        'counters': get_counters(author),
         'page_obj': page_obj,
-        'following': following,
+        **feed_cache_context(),
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@page_cache.cached_page(pages.trending_posts)
+def trending_posts(request):
+    """
+    Популярное: посты по затухающей оценке из TrendingPost. Порядок
+    меняется со временем, поэтому страницы нумерованы, а не по курсору.
+    """
+    page_obj = Paginator(trending.posts(), settings.PAGINATE_BY).get_page(
+        request.GET.get('page'))
+    return render(request, 'posts/trending.html', {'page_obj': page_obj})
+
+
+def search(request):
+    """Поиск постов по словам с учётом русской морфологии."""
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(query) if query else Post.objects.none()
+    page_obj = pages_pagination(request, posts)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@conditional.conditional_page(conditional.post_author_posts)
+@page_cache.cached_page(pages.post_detail)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.feed(), pk=post_id)
+    pages.remember_author(post)
     form = CommentForm()
     context = {
         'post': post,
+        'author_counters': get_counters(post.author),
         'form': form,
-        'comments': post.comments.all(),
+        'comments': comments.get_page(post, request.GET.get('comments')),
         'post_id': post_id,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@single_writer
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            thumbnails.schedule(post)
         return redirect('posts:profile', post.author.username)
     return render(request, 'posts/post_create.html', {'form': form})
 
 
 @login_required
+@single_writer
+@transaction.atomic
 def post_edit(request, post_id):
     edit_post = get_object_or_404(Post, pk=post_id)
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=edit_post)
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     return render(request, 'posts/post_create.html',
                   {'edit_post': True, 'form': form})
 
 
 @login_required
+@single_writer
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -98,6 +164,7 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        transaction.on_commit(lambda: comments.append(comment))
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -105,19 +172,22 @@ def add_comment(request, post_id):
 def follow_index(request):
     """
     Информация о текущем пользователе доступна в переменной request.user.
-    Находит посты, у которых автор связан через модель Follow
-    с текущим пользователем.
+    Посты авторов, на которых он подписан, читаются из его ленты
+    TimelineEntry, заполняемой при публикации и подписке.
     """
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = pages_pagination(request, posts)
+    paginator = TimelinePaginator(request.user, int(settings.PAGINATE_BY))
+    page_obj = pages_pagination(
+        request, timeline_posts(request.user), paginator)
     context = {
-        'posts': posts,
+        'posts': page_obj.object_list,
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@single_writer
+@transaction.atomic
 def profile_follow(request, username):
     """Подписаться на автора."""
     user = request.user
@@ -128,8 +198,54 @@ def profile_follow(request, username):
 
 
 @login_required
+@single_writer
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписаться от автора."""
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def follow_suggestions(request):
+    """Кого читать: авторы из готовых рекомендаций."""
+    context = {
+        'authors': suggestions.for_user(request, settings.PAGINATE_BY * 2),
+        'suggestions': True,
+    }
+    return render(request, 'posts/suggestions.html', context)
+
+
+def _usernames(request):
+    """Имена из повторяющегося поля username формы."""
+    usernames = request.POST.getlist('username')
+    if len(usernames) > settings.FOLLOW_BULK_LIMIT:
+        return None
+    return usernames
+
+
+@login_required
+@require_POST
+@single_writer
+@transaction.atomic
+def follow_many(request):
+    """Подписаться сразу на несколько авторов, например при знакомстве."""
+    usernames = _usernames(request)
+    if usernames is None:
+        return HttpResponseBadRequest('Слишком много авторов.')
+    follows.follow_many(request.user, usernames)
+    return redirect('posts:follow_index')
+
+
+@login_required
+@require_POST
+@single_writer
+@transaction.atomic
+def unfollow_many(request):
+    """Отписаться сразу от нескольких авторов."""
+    usernames = _usernames(request)
+    if usernames is None:
+        return HttpResponseBadRequest('Слишком много авторов.')
+    follows.unfollow_many(request.user, usernames)
+    return redirect('posts:follow_index')
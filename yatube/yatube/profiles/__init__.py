@@ -0,0 +1,73 @@
+"""
+Профили настроек. Профиль выбирается переменной окружения YATUBE_PROFILE
+и дописывает настройки из settings.py функцией configure(settings).
+Без переменной работает профиль development: SQLite и DEBUG; sqlite —
+SQLite, настроенный под нагрузку; production — PostgreSQL.
+
+Общее хранилище кеша в любом профиле выбирает YATUBE_CACHE: file,
+sqlite или redis, адрес — YATUBE_CACHE_LOCATION.
+"""
+import os
+from importlib import import_module
+
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT = 'development'
+
+# Бэкенд общего кеша и его адрес по умолчанию; None — путь от BASE_DIR.
+SHARED_CACHES = {
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', None),
+    'sqlite': ('core.cache.sqlite.SQLiteCache', None),
+    'redis': ('core.cache.redis.RedisCache', 'redis://127.0.0.1:6379/0'),
+}
+
+
+def env(name, default=None):
+    value = os.environ.get(name, default)
+    if value is None:
+        raise ImproperlyConfigured(f'Не задана переменная окружения {name}.')
+    return value
+
+
+def deployment(settings):
+    """
+    Общее для боевых профилей: без DEBUG, ключ и хосты из окружения,
+    /metrics только по токену YATUBE_METRICS_TOKEN, миниатюры строят
+    YATUBE_THUMBNAIL_WORKERS потоков сервера.
+    """
+    settings['DEBUG'] = False
+    settings['SECRET_KEY'] = env('DJANGO_SECRET_KEY')
+    settings['ALLOWED_HOSTS'] = env('DJANGO_ALLOWED_HOSTS').split(',')
+    settings['METRICS_IPS'] = ()
+    settings['METRICS_TOKEN'] = env('YATUBE_METRICS_TOKEN', '')
+    settings['THUMBNAIL_WORKERS'] = int(
+        env('YATUBE_THUMBNAIL_WORKERS', '2'))
+
+
+def shared_cache(settings):
+    kind = os.environ.get('YATUBE_CACHE')
+    if not kind:
+        return
+    if kind not in SHARED_CACHES:
+        raise ImproperlyConfigured(f'Неизвестный бэкенд кеша: {kind}.')
+    backend, location = SHARED_CACHES[kind]
+    if location is None:
+        name = 'cache.sqlite3' if kind == 'sqlite' else 'cache'
+        location = os.path.join(settings['BASE_DIR'], name)
+    settings['CACHES']['shared'] = {
+        'BACKEND': backend,
+        'LOCATION': env('YATUBE_CACHE_LOCATION', location),
+    }
+
+
+def configure(settings):
+    shared_cache(settings)
+    name = os.environ.get('YATUBE_PROFILE', DEFAULT)
+    settings['SETTINGS_PROFILE'] = name
+    if name == DEFAULT:
+        return
+    try:
+        profile = import_module(f'{__name__}.{name}')
+    except ModuleNotFoundError:
+        raise ImproperlyConfigured(f'Неизвестный профиль настроек: {name}.')
+    profile.configure(settings)
@@ -0,0 +1,56 @@
+"""
+PostgreSQL с постоянными соединениями или пулом и, по желанию, репликами
+для чтения лент.
+
+Переменные окружения:
+DJANGO_SECRET_KEY, DJANGO_ALLOWED_HOSTS — через запятую;
+POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST,
+POSTGRES_PORT — основная база;
+POSTGRES_CONN_MAX_AGE — сколько секунд держать соединение потока;
+POSTGRES_POOL_SIZE — размер пула соединений в процессе, 0 без пула;
+POSTGRES_PGBOUNCER — непусто, если между Django и базой PgBouncer в
+режиме transaction: тогда серверные курсоры отключаются;
+POSTGRES_REPLICAS — host[:port] реплик через запятую.
+"""
+from . import deployment, env
+
+
+def database(host, port):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env('POSTGRES_DB', 'yatube'),
+        'USER': env('POSTGRES_USER', 'yatube'),
+        'PASSWORD': env('POSTGRES_PASSWORD', ''),
+        'HOST': host,
+        'PORT': port,
+        'CONN_MAX_AGE': int(env('POSTGRES_CONN_MAX_AGE', '600')),
+        'OPTIONS': {'connect_timeout': 5},
+    }
+    pool_size = int(env('POSTGRES_POOL_SIZE', '0'))
+    if pool_size:
+        # Соединение возвращается в пул в конце каждого запроса.
+        config.update(
+            ENGINE='core.db.backends.postgresql_pool',
+            CONN_MAX_AGE=0,
+            POOL={'MIN_SIZE': 1, 'MAX_SIZE': pool_size},
+        )
+    if env('POSTGRES_PGBOUNCER', ''):
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
+def configure(settings):
+    deployment(settings)
+    databases = {'default': database(env('POSTGRES_HOST', 'localhost'),
+                                     env('POSTGRES_PORT', '5432'))}
+    replicas = filter(None, env('POSTGRES_REPLICAS', '').split(','))
+    for number, address in enumerate(replicas, 1):
+        host, _, port = address.partition(':')
+        databases[f'replica{number}'] = dict(
+            database(host, port or '5432'), TEST={'MIRROR': 'default'})
+    settings['DATABASES'] = databases
+    if len(databases) > 1:
+        settings['DATABASE_ROUTERS'] = ['core.db.routers.ReplicaRouter']
+        middleware = list(settings['MIDDLEWARE'])
+        middleware.insert(1, 'core.middleware.ReplicaMiddleware')
+        settings['MIDDLEWARE'] = middleware
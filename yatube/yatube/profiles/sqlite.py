@@ -0,0 +1,26 @@
+"""
+SQLite под нагрузкой, пока проект не переехал на PostgreSQL: WAL,
+постоянные соединения и очередь писателей (см. core.db.sqlite).
+
+Переменные окружения: DJANGO_SECRET_KEY, DJANGO_ALLOWED_HOSTS.
+"""
+from . import deployment
+
+
+def configure(settings):
+    deployment(settings)
+    settings['DATABASES']['default'].update(
+        CONN_MAX_AGE=600,
+        # Ожидание блокировки модулем sqlite3, в секундах.
+        OPTIONS={'timeout': 5},
+    )
+    settings['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Отрицательное значение — размер в КиБ, здесь 64 МиБ.
+        'cache_size': -64 * 1024,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    }
+    settings['SQLITE_WRITE_QUEUE'] = True
@@ -12,13 +12,34 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from yatube import profiles
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Кеш двухуровневый: LRU в памяти процесса перед общим для воркеров
+# хранилищем shared (см. core.cache.two_level). Здесь shared — память
+# процесса; файл, SQLite или Redis выбираются переменной YATUBE_CACHE.
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.two_level.TwoLevelCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'SHARED_ONLY': (
+                'posts:feed_generation',
+                'core:page_generation*',
+                'posts:comments:*:generation',
+                'posts:comments:*:tail',
+                'posts:follows:*',
+                'posts:structure_changed',
+                'posts:trending_changed',
+            ),
+            'LOCAL_TIMEOUT': 10,
+        },
+    },
+    'shared': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -55,6 +76,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'sorl.thumbnail',
 ]
 
@@ -68,7 +90,9 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -153,3 +177,119 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 PAGINATE_BY = 10
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Страницы лент и постов целиком (см. core.page_cache). Сигналы моделей
+# сбрасывают их сразу, так что срок нужен лишь для вытеснения.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Комментариев на странице поста; ветка читается и кешируется страницами.
+COMMENTS_PER_PAGE = 50
+
+# Наибольший ?limit= страницы JSON API.
+API_MAX_PAGE_SIZE = 100
+
+# Авторы с большим числом подписчиков не рассылают посты по лентам,
+# их посты подмешиваются при чтении. 0 отключает рассылку совсем.
+FOLLOW_TIMELINE_FANOUT_LIMIT = 1000
+
+# Множество подписок пользователя (см. posts.follows). Подписка и
+# отписка сбрасывают его сразу, срок нужен лишь для вытеснения.
+FOLLOW_SET_TIMEOUT = 60 * 60
+
+# Сколько авторов можно передать в follow_many/unfollow_many за раз.
+FOLLOW_BULK_LIMIT = 100
+
+# Рекомендации подписок (см. posts.suggestions): сколько авторов хранить
+# на пользователя, сколько похожих держать на автора и до какой длины
+# обрезать списки подписок и подписчиков при переборе.
+SUGGESTIONS_PER_USER = 50
+SUGGESTIONS_SIMILAR = 20
+SUGGESTIONS_MAX_DEGREE = 500
+
+# Популярное (см. posts.trending): за сколько секунд вклад события
+# уменьшается вдвое, веса событий, ниже какой оценки строка удаляется
+# при refresh_trending и сколько групп показывать на странице группы.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WEIGHTS = {'post': 1, 'comment': 2, 'follow': 3}
+TRENDING_MIN_SCORE = 0.01
+TRENDING_GROUPS = 5
+
+# Потоки процесса сервера, строящие миниатюры после фиксации транзакции.
+# При 0 задания только ставятся в очередь, и их выполняет отдельный
+# процесс manage.py process_thumbnail_jobs --watch. Потоки включают
+# боевые профили (см. yatube.profiles.deployment): при разработке и в
+# тестах они переживали бы тест и работали с его базой и файлами.
+# THUMBNAIL_INLINE строит миниатюры прямо при сохранении поста — только
+# для тестов.
+THUMBNAIL_WORKERS = 0
+THUMBNAIL_INLINE = False
+# Задание, взятое в работу дольше стольких секунд назад, считается
+# брошенным упавшим исполнителем и возвращается в очередь.
+THUMBNAIL_JOB_TIMEOUT = 10 * 60
+
+# Ширины производных картинки (по возрастанию) и современные форматы, в
+# которых они строятся, если их умеет кодировать Pillow. Запасной JPEG
+# (PNG для картинок с прозрачностью) строится всегда.
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_FORMATS = ('avif', 'webp')
+
+# Загрузки картинок пишутся сразу на диск и проверяются по заголовку до
+# конца загрузки (см. posts.uploads). Оригиналы больше
+# IMAGE_MAX_DIMENSION по длинной стороне уменьшаются при сохранении.
+FILE_UPLOAD_HANDLERS = ['posts.uploads.StreamingImageUploadHandler']
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_DIMENSION = 2560
+
+# Сколько SQL-запросов может сделать представление, включая запросы
+# сессии и пользователя. Превышение пишется в лог, а при
+# QUERY_BUDGET_STRICT завершает запрос ошибкой — так его ловят тесты.
+QUERY_BUDGETS = {
+    'posts:index': 6,
+    'posts:group_list': 7,
+    'posts:profile': 7,
+    'posts:post_detail': 6,
+    'posts:follow_index': 5,
+    'posts:search': 4,
+    'posts:suggestions': 5,
+    'posts:trending': 4,
+    'posts:api_index': 3,
+    'posts:api_group': 4,
+    'posts:api_profile': 4,
+    'posts:api_follow': 4,
+    'posts:api_post_detail': 3,
+    'posts:api_comments': 4,
+}
+# Включается в тестах проекта, см. core.testing.TestCase.
+QUERY_BUDGET_STRICT = False
+
+# /metrics отдаётся по заголовку Authorization: Bearer METRICS_TOKEN, а
+# без токена — только запросам с METRICS_IPS. За обратным прокси все
+# запросы приходят с его адреса, поэтому боевые профили список адресов
+# очищают и открывают /metrics только по токену.
+METRICS_IPS = ('127.0.0.1', '::1')
+METRICS_TOKEN = ''
+
+# Ленты, которые при настроенных репликах читаются с них. После записи
+# (POST или WRITE_VIEWS) пользователь REPLICA_PIN_SECONDS читает из основной базы, чтобы сразу
+# увидеть свой пост или комментарий, даже если реплика отстаёт.
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:search',
+)
+WRITE_VIEWS = ('posts:profile_follow', 'posts:profile_unfollow')
+REPLICA_PIN_SECONDS = 5
+
+# PRAGMA для каждого нового соединения с SQLite и очередь пишущих
+# представлений (см. core.db.sqlite); включаются профилем sqlite.
+SQLITE_PRAGMAS = {}
+SQLITE_WRITE_QUEUE = False
+
+# Последним: профиль из YATUBE_PROFILE переопределяет всё, что выше.
+profiles.configure(globals())